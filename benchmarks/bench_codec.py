@@ -0,0 +1,78 @@
+"""Bytes on the wire and CPU per second of audio for each session audio format.
+
+Uplink is 24kHz capture -> WireEncoder -> base64 in 100ms chunks (the
+AudioBatcher default); downlink is base64 deltas -> WireDecoder, as in
+``AudioPlayerAsync.add_data``. SNR is for the uplink-then-downlink round trip.
+
+    python -m benchmarks.bench_codec
+"""
+from __future__ import annotations
+
+import base64
+import time
+
+import numpy as np
+
+from src.audio_util import AUDIO_FORMATS, SAMPLE_RATE, WireDecoder
+from src.capture import WireEncoder
+
+DURATION_S = 60
+CHUNK_S = 0.1
+
+
+def speech_like() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    t = np.arange(DURATION_S * SAMPLE_RATE) / SAMPLE_RATE
+    # a few voiced harmonics under a slow syllable envelope, plus some breath noise
+    voiced = sum(np.sin(2 * np.pi * f * t) / k for k, f in enumerate((140, 280, 420, 700, 1100, 2300), 1))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)
+    signal = 6000 * voiced * envelope + rng.normal(0, 300, len(t))
+    return np.clip(signal, -32768, 32767).astype(np.int16)
+
+
+def bench_format(audio_format: str, pcm: np.ndarray) -> dict:
+    chunk = int(CHUNK_S * SAMPLE_RATE)
+    chunks = [pcm[i : i + chunk].tobytes() for i in range(0, len(pcm), chunk)]
+
+    encoder = WireEncoder(audio_format)
+    start = time.process_time()
+    wire = [base64.b64encode(encoder.encode(c)).decode("utf-8") for c in chunks]
+    encode_cpu = time.process_time() - start
+
+    decoder = WireDecoder(audio_format)
+    start = time.process_time()
+    decoded = [decoder.decode(base64.b64decode(w)) for w in wire]
+    decoded.append(decoder.flush())
+    decode_cpu = time.process_time() - start
+
+    out = np.concatenate(decoded).astype(np.float64)
+    ref = pcm.astype(np.float64)
+    # both resamplers delay by their filter's lookahead; align on the best lag before comparing
+    window = ref[SAMPLE_RATE : 2 * SAMPLE_RATE]
+    lag = max(range(200), key=lambda d: np.dot(window, out[SAMPLE_RATE + d : 2 * SAMPLE_RATE + d]))
+    n = min(len(ref), len(out) - lag)
+    error = ref[:n] - out[lag : lag + n]
+    snr = 10 * np.log10(np.sum(ref[:n] ** 2) / max(np.sum(error**2), 1e-9))
+
+    return {
+        "wire_bytes_per_s": sum(len(w) for w in wire) / DURATION_S,
+        "encode_us_per_s": encode_cpu / DURATION_S * 1e6,
+        "decode_us_per_s": decode_cpu / DURATION_S * 1e6,
+        "snr_db": snr,
+    }
+
+
+def main() -> None:
+    pcm = speech_like()
+    print(f"{DURATION_S}s of 24kHz audio in {CHUNK_S * 1000:.0f}ms chunks")
+    print(f"{'format':10s} {'wire B/s':>10s} {'encode':>14s} {'decode':>14s} {'SNR':>8s}")
+    for audio_format in AUDIO_FORMATS:
+        r = bench_format(audio_format, pcm)
+        print(
+            f"{audio_format:10s} {r['wire_bytes_per_s']:10.0f} "
+            f"{r['encode_us_per_s']:8.0f} us/s {r['decode_us_per_s']:8.0f} us/s {r['snr_db']:6.1f} dB"
+        )
+
+
+if __name__ == "__main__":
+    main()
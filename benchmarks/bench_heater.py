@@ -0,0 +1,76 @@
+"""Heater tool latency: one-off requests.get vs the pooled HeaterClient.
+
+Runs against the local stub and a closed port standing in for a dead heater.
+
+    python -m benchmarks.bench_heater
+"""
+from __future__ import annotations
+
+import asyncio
+import socket
+import time
+
+import requests
+
+from benchmarks.heater_stub import start_stub
+from src.heater import HeaterClient
+
+CALLS = 50
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def bench_requests(base_url: str) -> float:
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        requests.get(base_url + "/", timeout=5)
+    return (time.perf_counter() - start) / CALLS
+
+
+async def bench_client(base_url: str) -> tuple[float, float]:
+    client = HeaterClient(base_url)
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        await client.trigger()
+    trigger = (time.perf_counter() - start) / CALLS
+
+    await client.refresh_health()
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        await client.health()
+    health = (time.perf_counter() - start) / CALLS
+    await client.close()
+    return trigger, health
+
+
+async def bench_dead(base_url: str) -> list[float]:
+    client = HeaterClient(base_url, timeout_s=1.0)
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        await client.trigger()
+        timings.append(time.perf_counter() - start)
+    await client.close()
+    return timings
+
+
+def main() -> None:
+    server = start_stub()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    print(f"requests.get per call:   {bench_requests(base_url) * 1000:7.2f} ms")
+    trigger, health = asyncio.run(bench_client(base_url))
+    print(f"HeaterClient.trigger:    {trigger * 1000:7.2f} ms")
+    print(f"HeaterClient.health:     {health * 1000:7.2f} ms (cached)")
+
+    dead = asyncio.run(bench_dead(f"http://127.0.0.1:{unused_port()}"))
+    print("dead heater, successive calls: " + ", ".join(f"{t * 1000:.2f} ms" for t in dead))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""File ingestion: pydub (ffmpeg) vs the streaming WAV decoder and polyphase resampler.
+
+Decodes a generated 44.1kHz stereo WAV to 24kHz mono pcm16. CPU includes
+child processes, so ffmpeg's share of the pydub path is counted. The pydub
+cases are skipped when ffmpeg is not installed.
+
+    python -m benchmarks.bench_ingest
+"""
+from __future__ import annotations
+
+import io
+import resource
+import time
+import tracemalloc
+import wave
+
+import numpy as np
+
+from src.audio_util import CHANNELS, SAMPLE_RATE, iter_pcm16_base64, iter_pcm16_chunks
+
+DURATION_S = 60
+SOURCE_RATE = 44100
+
+
+def make_wav() -> bytes:
+    t = np.arange(DURATION_S * SOURCE_RATE) / SOURCE_RATE
+    tone = (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(SOURCE_RATE)
+        f.writeframes(np.repeat(tone, 2).tobytes())
+    return buf.getvalue()
+
+
+def cpu_seconds() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def pydub_ffmpeg(data: bytes) -> int:
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(io.BytesIO(data))
+    return len(audio.set_frame_rate(SAMPLE_RATE).set_channels(CHANNELS).set_sample_width(2).raw_data)
+
+
+def pydub_wav(data: bytes) -> int:
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(io.BytesIO(data), format="wav")
+    return len(audio.set_frame_rate(SAMPLE_RATE).set_channels(CHANNELS).set_sample_width(2).raw_data)
+
+
+def streaming(data: bytes) -> int:
+    return sum(len(chunk) for chunk in iter_pcm16_chunks(io.BytesIO(data)))
+
+
+def streaming_base64(data: bytes) -> int:
+    return sum(len(chunk) for chunk in iter_pcm16_base64(io.BytesIO(data)))
+
+
+CASES = {
+    "pydub (ffmpeg)": pydub_ffmpeg,
+    "pydub (wav, audioop)": pydub_wav,
+    "streaming": streaming,
+    "streaming + base64": streaming_base64,
+}
+
+
+def main() -> None:
+    data = make_wav()
+    print(f"input: {DURATION_S}s {SOURCE_RATE}Hz stereo, {len(data) / 1e6:.1f} MB")
+    for name, case in CASES.items():
+        cpu = cpu_seconds()
+        start = time.perf_counter()
+        try:
+            size = case(data)
+        except Exception as e:
+            print(f"{name:22s} skipped: {e}")
+            continue
+        elapsed = time.perf_counter() - start
+        cpu = cpu_seconds() - cpu
+
+        # tracing slows allocations down, so memory is measured in a separate run
+        tracemalloc.start()
+        case(data)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(
+            f"{name:22s} {elapsed * 1000:8.1f} ms wall  {cpu * 1000:8.1f} ms cpu  "
+            f"{peak / 1e6:7.1f} MB peak  {size / 1e6:.2f} MB out"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Prompt size and per-turn cost over a long synthetic chat, unbounded list vs ConversationMemory.
+
+Each turn is a Japanese user message and a reply; every 4th turn the reply
+first calls get_whiteboard_data and gets a whiteboard-sized result. Per-turn
+time is the client-side work that grows with history: the memory bookkeeping
+plus serializing the request body, as the OpenAI client does before sending.
+Server-side prefill time and cost grow with the prompt tokens. The estimator
+is compared against tiktoken when it is installed.
+
+    python -m benchmarks.bench_memory
+    python -m benchmarks.bench_memory --turns 200 --max-tokens 2000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from src.function_dict import get_chat_tools
+from src.memory import DEFAULT_MAX_TOKENS, ConversationMemory, SQLiteMemoryStore, estimate_tokens, message_tokens
+
+SYSTEM_PROMPT = "あなたはシェアハウスのアシスタントのマイコです。発言は短くお願いします。"
+WHITEBOARD = "\n".join(f"- 買い物: 牛乳と卵とトイレットペーパー その{i}" for i in range(12))
+REPORT_EVERY = 50
+
+
+def turn_messages(turn: int) -> list[dict]:
+    messages = [{"role": "user", "content": f"今日の予定{turn}番目について教えて。ホワイトボードに何か書いてある？"}]
+    if turn % 4 == 0:
+        call = {
+            "id": f"call_{turn}",
+            "type": "function",
+            "function": {"name": "get_whiteboard_data", "arguments": "{}"},
+        }
+        messages.append({"role": "assistant", "content": None, "tool_calls": [call]})
+        messages.append({"role": "tool", "content": WHITEBOARD, "tool_call_id": call["id"]})
+    messages.append({"role": "assistant", "content": f"ホワイトボードには買い物リストがあるどす。予定{turn}は夕方からえ。" * 2})
+    return messages
+
+
+def run(turns: int, memory: ConversationMemory | None) -> dict:
+    tools = get_chat_tools()
+    history = [{"role": "system", "content": SYSTEM_PROMPT}]
+    prompt_tokens = []
+    elapsed = []
+    checkpoints = {}
+    for turn in range(1, turns + 1):
+        started = time.perf_counter()
+        for message in turn_messages(turn):
+            if memory is None:
+                history.append(message)
+            else:
+                memory.append(message)
+            # the prompt as sent for the next request (the user message, or after tool results)
+            messages = history if memory is None else memory.messages
+            body = json.dumps({"model": "gpt-4o-mini", "messages": messages, "tools": tools}, ensure_ascii=False)
+        elapsed.append(time.perf_counter() - started)
+        tokens = sum(message_tokens(message) for message in messages)
+        prompt_tokens.append(tokens)
+        if turn % REPORT_EVERY == 0 or turn == 1:
+            checkpoints[turn] = (tokens, len(messages), len(body))
+    return {
+        "checkpoints": checkpoints,
+        "total_prompt_tokens": sum(prompt_tokens),
+        "mean_turn_us": sum(elapsed) / len(elapsed) * 1e6,
+        "last_turn_us": sum(elapsed[-10:]) / 10 * 1e6,
+        "final_messages": messages,
+    }
+
+
+def bench_store(turns: int, max_tokens: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "memory.sqlite3")
+        store = SQLiteMemoryStore(path)
+        memory = ConversationMemory(SYSTEM_PROMPT, max_tokens=max_tokens, store=store, session_id="bench")
+        appended = 0
+        started = time.perf_counter()
+        for turn in range(1, turns + 1):
+            for message in turn_messages(turn):
+                memory.append(message)
+                appended += 1
+        append_us = (time.perf_counter() - started) / appended * 1e6
+        store.close()
+
+        store = SQLiteMemoryStore(path)
+        started = time.perf_counter()
+        resumed = ConversationMemory(SYSTEM_PROMPT, max_tokens=max_tokens, store=store, session_id="bench")
+        resume_ms = (time.perf_counter() - started) * 1000
+        same = resumed.messages == memory.messages
+        store.close()
+    return {"append_us": append_us, "resume_ms": resume_ms, "loaded": len(resumed.history), "total": appended, "same": same}
+
+
+def estimator_error(messages: list[dict]) -> str:
+    try:
+        import tiktoken
+    except ImportError:
+        return "tiktoken not installed, skipped"
+    encoding = tiktoken.get_encoding("o200k_base")
+    texts = [message["content"] for message in messages if message.get("content")]
+    exact = sum(len(encoding.encode(text)) for text in texts)
+    estimate = sum(estimate_tokens(text) for text in texts)
+    return f"{estimate} estimated vs {exact} o200k tokens ({(estimate - exact) / exact * 100:+.0f}%)"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS)
+    args = parser.parse_args()
+
+    unbounded = run(args.turns, None)
+    memory = ConversationMemory(SYSTEM_PROMPT, max_tokens=args.max_tokens)
+    budgeted = run(args.turns, memory)
+
+    print(f"{args.turns} turns, budget {args.max_tokens} estimated tokens")
+    print(f"{'turn':>5s} {'unbounded tok':>14s} {'msgs':>5s} {'body KB':>8s}   {'budgeted tok':>13s} {'msgs':>5s} {'body KB':>8s}")
+    for turn in unbounded["checkpoints"]:
+        u, b = unbounded["checkpoints"][turn], budgeted["checkpoints"][turn]
+        print(f"{turn:5d} {u[0]:14d} {u[1]:5d} {u[2] / 1024:8.1f}   {b[0]:13d} {b[1]:5d} {b[2] / 1024:8.1f}")
+    print(f"total prompt tokens: {unbounded['total_prompt_tokens']} unbounded, {budgeted['total_prompt_tokens']} budgeted "
+          f"({budgeted['total_prompt_tokens'] / unbounded['total_prompt_tokens'] * 100:.0f}%), {memory.evictions} evictions")
+    print(f"client time per turn: {unbounded['mean_turn_us']:.0f} us unbounded (last 10: {unbounded['last_turn_us']:.0f} us), "
+          f"{budgeted['mean_turn_us']:.0f} us budgeted (last 10: {budgeted['last_turn_us']:.0f} us)")
+
+    store = bench_store(args.turns, args.max_tokens)
+    print(f"sqlite: {store['append_us']:.0f} us per message; resume in {store['resume_ms']:.1f} ms loading "
+          f"{store['loaded']} of {store['total']} messages (prompt identical: {store['same']})")
+    print(f"estimator: {estimator_error(unbounded['final_messages'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Microbenchmark for the AudioPlayerAsync playback callback.
+
+Compares the old list-of-arrays queue with the ring buffer under a backlog of
+many small ``response.audio.delta`` chunks, then times the mixer callback with
+speech only and with speech, a ducked effect and filler overlapping.
+
+    python -m benchmarks.bench_playback
+"""
+from __future__ import annotations
+
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.audio_util import VOICE_EFFECTS, VOICE_FILLER, AudioPlayerAsync
+from src.ring_buffer import RingBuffer
+
+SAMPLE_RATE = 24000
+BLOCK = int(0.05 * SAMPLE_RATE)
+DELTA_SAMPLES = 240  # 10ms deltas, the worst case for the old queue
+N_DELTAS = 5000
+N_BLOCKS = 200
+
+
+def legacy_callback(queue: list, outdata: np.ndarray, frames: int) -> None:
+    data = np.empty(0, dtype=np.int16)
+    while len(data) < frames and len(queue) > 0:
+        item = queue.pop(0)
+        frames_needed = frames - len(data)
+        data = np.concatenate((data, item[:frames_needed]))
+        if len(item) > frames_needed:
+            queue.insert(0, item[frames_needed:])
+    if len(data) < frames:
+        data = np.concatenate((data, np.zeros(frames - len(data), dtype=np.int16)))
+    outdata[:] = data.reshape(-1, 1)
+
+
+def ring_callback(queue: RingBuffer, outdata: np.ndarray, frames: int) -> None:
+    n = queue.read_into(outdata[:, 0])
+    outdata[n:] = 0
+
+
+def measure(name: str, queue, callback) -> None:
+    outdata = np.zeros((BLOCK, 1), dtype=np.int16)
+
+    start = time.perf_counter()
+    for _ in range(N_BLOCKS):
+        callback(queue, outdata, BLOCK)
+    elapsed = time.perf_counter() - start
+
+    # peak traced memory inside a single callback approximates what it allocates per block
+    peak_per_block = 0
+    tracemalloc.start()
+    for _ in range(N_BLOCKS):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        callback(queue, outdata, BLOCK)
+        _, peak = tracemalloc.get_traced_memory()
+        peak_per_block = max(peak_per_block, peak - base)
+    tracemalloc.stop()
+
+    print(
+        f"{name:>6}: {elapsed / N_BLOCKS * 1e6:8.1f} us/block, "
+        f"{peak_per_block:8d} bytes allocated/block (peak)"
+    )
+
+
+class NullStream:
+    latency = 0.0
+
+    def __init__(self, **kwargs):
+        pass
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def mixer_case(voices: tuple[str, ...]):
+    player = AudioPlayerAsync(stream_factory=NullStream)
+    # enough for both passes in measure()
+    samples = np.arange(2 * N_BLOCKS * BLOCK, dtype=np.int16)
+    player.add_data(samples.tobytes())
+    for voice in voices:
+        player.play(samples, voice=voice)
+    return player, lambda player, outdata, frames: player.callback(outdata, frames, None, None)
+
+
+def main() -> None:
+    delta = np.arange(DELTA_SAMPLES, dtype=np.int16)
+    print(f"backlog: {N_DELTAS} deltas x {DELTA_SAMPLES} samples, block {BLOCK} samples")
+
+    def fresh_legacy() -> list:
+        return [delta.copy() for _ in range(N_DELTAS)]
+
+    def fresh_ring() -> RingBuffer:
+        ring = RingBuffer(N_DELTAS * DELTA_SAMPLES)
+        for _ in range(N_DELTAS):
+            ring.write(delta)
+        return ring
+
+    measure("list", fresh_legacy(), legacy_callback)
+    measure("ring", fresh_ring(), ring_callback)
+    measure("speech", *mixer_case(()))
+    measure("mix x3", *mixer_case((VOICE_EFFECTS, VOICE_FILLER)))
+
+
+if __name__ == "__main__":
+    main()
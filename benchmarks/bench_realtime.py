@@ -0,0 +1,216 @@
+"""End-to-end RealtimeApp benchmark against the local fake Realtime server.
+
+Each session runs ``handle_realtime_connection`` against ``FakeRealtimeServer``
+with the real playback callback driven by a virtual output device and the
+uplink (MicCapture -> VAD -> AudioBatcher) fed by a virtual input device.
+No credentials, network or sound card are needed.
+
+    python -m benchmarks.bench_realtime
+    python -m benchmarks.bench_realtime --speed inf --sessions 4 --max-overhead-ms 50
+    python -m benchmarks.bench_realtime --trace recorded.jsonl --speed 1
+    python -m benchmarks.bench_realtime --speed 1 --jitter 0.08
+    python -m benchmarks.bench_realtime --format g711_ulaw
+
+``turn overhead`` is the time to first audio minus the server-side response
+delay in the trace, i.e. what the client and transport add.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import threading
+import time
+import types
+from functools import partial
+
+import numpy as np
+from openai import AsyncOpenAI
+
+from realtime_with_fc import PLAYBACK_GRACE_S, RealtimeApp
+from src.audio_util import AUDIO_FORMAT_PCM16, AUDIO_FORMATS, SAMPLE_RATE, AudioPlayerAsync
+from src.capture import MicCapture
+from src.fake_realtime import FakeRealtimeServer, synthetic_trace
+from src.metrics import MetricsRegistry
+from src.trace import load_trace
+
+TURNS = 3
+UTTERANCE_S = 1.5
+REPLY_S = 3.0
+RESPONSE_DELAY_S = 0.3
+TOOL_DELAY_S = 0.05
+
+
+class VirtualStream:
+    """Stands in for a sounddevice stream, calling ``callback`` from a thread at ``speed`` x real time."""
+
+    latency = 0.0
+
+    def __init__(self, callback, samplerate, channels, dtype, blocksize, device=None, speed=1.0, source=None):
+        self.callback = callback
+        self.blocksize = blocksize
+        self.period = max(blocksize / samplerate / speed, 0.001)
+        self.source = source
+        self.blocks = 0
+        self._running = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._running.set()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        buf = np.zeros((self.blocksize, 1), dtype=np.int16)
+        status = types.SimpleNamespace(input_overflow=False, output_underflow=False)
+        next_at = time.perf_counter()
+        while self._running.is_set():
+            if self.source is not None:
+                # input device: stops producing once the recording is exhausted
+                start = self.blocks * self.blocksize
+                if start + self.blocksize > len(self.source):
+                    return
+                buf[:, 0] = self.source[start : start + self.blocksize]
+            self.callback(buf, self.blocksize, None, status)
+            self.blocks += 1
+            next_at += self.period
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+
+    def stop(self) -> None:
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self) -> None:
+        self.stop()
+
+
+class StubToolExecutor:
+    """Answers every tool call after a fixed delay instead of touching the network."""
+
+    def __init__(self, delay_s: float = TOOL_DELAY_S):
+        self.delay_s = delay_s
+        self.calls = 0
+
+    async def run(self, name: str, args: dict) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay_s)
+        return f"{name}: ok"
+
+
+def uplink_audio() -> np.ndarray:
+    """User speech aligned with the synthetic trace: an utterance, then silence while the reply plays."""
+    t = np.arange(int(UTTERANCE_S * SAMPLE_RATE)) / SAMPLE_RATE
+    speech = (3000 * np.sin(2 * np.pi * 150 * t)).astype(np.int16)
+    quiet = np.zeros(int((RESPONSE_DELAY_S + REPLY_S) * SAMPLE_RATE), dtype=np.int16)
+    return np.concatenate([speech, quiet] * TURNS)
+
+
+async def run_session(server: FakeRealtimeServer, speed: float, metrics: MetricsRegistry, audio_format: str) -> dict:
+    client = AsyncOpenAI(api_key="fake", websocket_base_url=server.url)
+    app = RealtimeApp(
+        metrics=metrics,
+        client=client,
+        audio_format=audio_format,
+        audio_player=AudioPlayerAsync(stream_factory=partial(VirtualStream, speed=speed), audio_format=audio_format),
+        tool_executor=StubToolExecutor(),
+        capture=MicCapture(stream_factory=partial(VirtualStream, speed=speed, source=uplink_audio())),
+    )
+    app.should_send_audio.set()
+    uplink = asyncio.create_task(app.send_mic_audio())
+    try:
+        await app.handle_realtime_connection()
+        # turns are closed PLAYBACK_GRACE_S after the last response.done
+        await asyncio.sleep(PLAYBACK_GRACE_S + 0.1)
+        return app.audio_player.stats()
+    finally:
+        uplink.cancel()
+        # the uplink may also have hit the closed connection first
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await uplink
+        app.audio_player.terminate()
+        app.transcripts.close()
+
+
+async def bench(trace: list[dict], speed: float, sessions: int, audio_format: str = AUDIO_FORMAT_PCM16) -> dict:
+    server = FakeRealtimeServer(trace, speed=speed)
+    await server.start()
+    metrics = MetricsRegistry()
+
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    # the app logs every event; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        playback = await asyncio.gather(*(run_session(server, speed, metrics, audio_format) for _ in range(sessions)))
+    wall = time.perf_counter() - wall - PLAYBACK_GRACE_S - 0.1
+    cpu = time.process_time() - cpu
+    await server.close()
+
+    summary = metrics.summary()
+    ttfa = summary.get("turn_time_to_first_audio_seconds", {"count": 0, "mean": 0.0})
+    return {
+        "sessions": sessions,
+        "events": server.events_sent,
+        "events_per_s": server.events_sent / wall,
+        "uplink_kib": server.audio_bytes_received / 1024,
+        "downlink_kib": server.audio_bytes_sent / 1024,
+        "turns": ttfa["count"],
+        "ttfa_ms": ttfa["mean"] * 1000,
+        "overhead_ms": (ttfa["mean"] - RESPONSE_DELAY_S / speed) * 1000,
+        "cpu_per_session_ms": cpu / sessions * 1000,
+        "underruns": sum(stats["underruns"] for stats in playback),
+        "prebuffer_ms": sum(stats["mean_prebuffer_ms"] for stats in playback) / sessions,
+        "handler_us": {
+            name: stats["mean"] * 1e6 for name, stats in summary.items() if name.startswith("event_handler_seconds")
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--speed", type=float, default=10.0, help="replay speed, 'inf' for as fast as possible")
+    parser.add_argument("--sessions", type=int, default=2)
+    parser.add_argument("--trace", help="JSONL trace recorded with EVENT_TRACE_PATH (default: synthetic)")
+    parser.add_argument("--tool", action="store_true", help="add a tool call round trip to every turn")
+    parser.add_argument("--format", choices=AUDIO_FORMATS, default=AUDIO_FORMAT_PCM16)
+    parser.add_argument("--jitter", type=float, default=0.0, help="mean extra delay per audio delta (seconds)")
+    parser.add_argument("--max-overhead-ms", type=float, help="exit non-zero when the turn overhead exceeds this")
+    args = parser.parse_args()
+
+    if args.trace:
+        trace = load_trace(args.trace)
+    else:
+        trace = synthetic_trace(
+            turns=TURNS,
+            utterance_s=UTTERANCE_S,
+            reply_s=REPLY_S,
+            response_delay_s=RESPONSE_DELAY_S,
+            tool_call=("get_current_users", {}) if args.tool else None,
+            jitter_s=args.jitter,
+            audio_format=args.format,
+        )
+
+    result = asyncio.run(bench(trace, args.speed, args.sessions, args.format))
+    print(f"sessions:              {result['sessions']} at {args.speed}x, {args.format}")
+    print(f"server events:         {result['events']} ({result['events_per_s']:.0f}/s)")
+    print(f"uplink audio:          {result['uplink_kib']:.0f} KiB")
+    print(f"downlink audio:        {result['downlink_kib']:.0f} KiB")
+    print(f"turns measured:        {result['turns']}")
+    print(f"time to first audio:   {result['ttfa_ms']:.2f} ms")
+    print(f"turn overhead:         {result['overhead_ms']:.2f} ms")
+    print(f"CPU per session:       {result['cpu_per_session_ms']:.1f} ms")
+    print(f"playback underruns:    {result['underruns']} (mean prebuffer {result['prebuffer_ms']:.1f} ms)")
+    for name, micros in sorted(result["handler_us"].items()):
+        print(f"  {name}: {micros:.1f} us")
+
+    if args.max_overhead_ms is not None and result["overhead_ms"] > args.max_overhead_ms:
+        print(f"turn overhead above {args.max_overhead_ms} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
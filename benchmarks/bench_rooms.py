@@ -0,0 +1,110 @@
+"""Memory and CPU per room when the Supervisor runs several rooms in one process.
+
+Each room count runs in a fresh child process against a FakeRealtimeServer
+in this (parent) process, with virtual devices at real-time speed, so the
+numbers are the client's alone. One room is what a separate
+``realtime_with_fc.py`` process costs; the extra cost of each further room
+is compared against it.
+
+    python -m benchmarks.bench_rooms
+    python -m benchmarks.bench_rooms --rooms 1 2 4 8 --measure 8
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import time
+from functools import partial
+
+from openai import AsyncOpenAI
+
+from benchmarks.bench_realtime import REPLY_S, RESPONSE_DELAY_S, TURNS, UTTERANCE_S, StubToolExecutor, VirtualStream, uplink_audio
+from src.fake_realtime import FakeRealtimeServer, synthetic_trace
+
+WARMUP_S = 2.0
+MEASURE_S = 8.0
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def child(url: str, rooms: int, measure_s: float) -> dict:
+    from supervisor import RoomConfig, Supervisor
+
+    supervisor = Supervisor(
+        [RoomConfig(name=f"room{i}", input_device=0, output_device=0, wake_word=None) for i in range(rooms)],
+        client=AsyncOpenAI(api_key="fake", websocket_base_url=url),
+        tool_executor=StubToolExecutor(),
+        devices=[],
+        input_stream_factory=partial(VirtualStream, source=uplink_audio()),
+        output_stream_factory=VirtualStream,
+        metrics_port=None,
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        task = asyncio.create_task(supervisor.run())
+        await asyncio.sleep(WARMUP_S)
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        await asyncio.sleep(measure_s)
+        cpu = time.process_time() - cpu
+        wall = time.perf_counter() - wall
+        rss = rss_mb()
+        connected = sum(app.connected.is_set() for app in supervisor.apps.values())
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    return {"rooms": rooms, "connected": connected, "rss_mb": rss, "cpu_percent": cpu / wall * 100}
+
+
+async def parent(room_counts: list[int], measure_s: float) -> list[dict]:
+    trace = synthetic_trace(turns=TURNS, utterance_s=UTTERANCE_S, reply_s=REPLY_S, response_delay_s=RESPONSE_DELAY_S)
+    server = FakeRealtimeServer(trace, speed=1.0)
+    await server.start()
+    results = []
+    try:
+        for rooms in room_counts:
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "benchmarks.bench_rooms",
+                "--child", server.url, "--rooms", str(rooms), "--measure", str(measure_s),
+                stdout=asyncio.subprocess.PIPE,
+            )
+            out, _ = await proc.communicate()
+            results.append(json.loads(out.decode().strip().splitlines()[-1]))
+    finally:
+        await server.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--measure", type=float, default=MEASURE_S, help="seconds of conversation measured")
+    parser.add_argument("--child", metavar="URL", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.child, args.rooms[0], args.measure))))
+        return
+
+    results = asyncio.run(parent(args.rooms, args.measure))
+    base = next((r for r in results if r["rooms"] == 1), results[0])
+    print(f"{'rooms':>5s} {'connected':>9s} {'RSS MB':>8s} {'CPU %':>7s} {'+MB/room':>9s} {'+CPU%/room':>11s}")
+    for r in results:
+        extra = max(r["rooms"] - base["rooms"], 1)
+        mb = (r["rss_mb"] - base["rss_mb"]) / extra
+        cpu = (r["cpu_percent"] - base["cpu_percent"]) / extra
+        print(f"{r['rooms']:5d} {r['connected']:9d} {r['rss_mb']:8.1f} {r['cpu_percent']:7.2f} {mb:9.1f} {cpu:11.2f}")
+    print(f"one room (a whole process): {base['rss_mb']:.1f} MB, {base['cpu_percent']:.2f}% CPU")
+
+
+if __name__ == "__main__":
+    main()
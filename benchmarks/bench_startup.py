@@ -0,0 +1,61 @@
+"""Cold-start benchmark for the tool registry.
+
+Each case runs in a fresh interpreter and reports the time to get the
+session tool schema, which is all RealtimeApp needs before connecting.
+``eager`` imports every tool module and initializes Firebase up front, as
+function_dict used to (it needs the credentials submodule).
+
+    python -m benchmarks.bench_startup
+"""
+from __future__ import annotations
+
+import statistics
+import subprocess
+import sys
+
+RUNS = 5
+
+CASES = {
+    "lazy": "import src.function_dict as f; f.get_tools()",
+    "eager": (
+        "import src.tools; import src.firebase as fb; fb.initialize_firebase(fb.CREDENTIALS_PATH); "
+        "import src.function_dict as f; f.get_tools()"
+    ),
+}
+
+TEMPLATE = """
+import time
+t = time.perf_counter()
+{code}
+print(time.perf_counter() - t)
+"""
+
+
+def run_case(code: str) -> float | None:
+    proc = subprocess.run(
+        [sys.executable, "-c", TEMPLATE.format(code=code)],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        print(proc.stderr.strip().splitlines()[-1])
+        return None
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    for name, code in CASES.items():
+        timings = []
+        for _ in range(RUNS):
+            timing = run_case(code)
+            if timing is None:
+                break
+            timings.append(timing)
+        if len(timings) < RUNS:
+            print(f"{name:>6}: failed")
+            continue
+        print(f"{name:>6}: median {statistics.median(timings) * 1000:8.1f} ms over {RUNS} runs")
+
+
+if __name__ == "__main__":
+    main()
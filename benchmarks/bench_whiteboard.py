@@ -0,0 +1,49 @@
+"""Whiteboard read latency: RTDB round trip vs the listener-backed cache.
+
+Uses the in-memory fake RTDB with a simulated round trip, so it runs offline.
+
+    python -m benchmarks.bench_whiteboard
+"""
+from __future__ import annotations
+
+import time
+
+from src.fake_rtdb import FakeDatabase
+from src.whiteboard import WhiteboardCache, WhiteboardConflict
+
+ROUND_TRIP_S = 0.08
+READS = 50
+
+
+def main() -> None:
+    database = FakeDatabase({"whiteboard": {"content": "・納豆を買う\n・ゴミ出し"}}, latency_s=ROUND_TRIP_S)
+    ref = database.reference("whiteboard/content")
+
+    start = time.perf_counter()
+    for _ in range(READS):
+        ref.get()
+    direct = (time.perf_counter() - start) / READS
+
+    cache = WhiteboardCache(ref)
+    cache.start()
+    start = time.perf_counter()
+    for _ in range(READS):
+        cache.get()
+    cached = (time.perf_counter() - start) / READS
+
+    print(f"direct get: {direct * 1e6:10.1f} us/read")
+    print(f"cache get:  {cached * 1e6:10.1f} us/read")
+
+    content, version = cache.snapshot()
+    # another client edits the board between our read and our write
+    database.reference("whiteboard/content").set(content + "\n・牛乳")
+    try:
+        cache.compare_and_set(content + "\n・卵", version)
+        print("stale write accepted (unexpected)")
+    except WhiteboardConflict as e:
+        print(f"stale write rejected: {e}")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
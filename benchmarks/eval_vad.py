@@ -0,0 +1,116 @@
+"""Offline evaluation of the client-side VAD.
+
+Reports frame-level precision/recall and CPU time per second of audio. Each
+WAV file may have a sidecar ``<name>.labels`` file with one ``start end`` pair
+(seconds) per speech segment; without labels only the gated ratio is shown.
+With no arguments a synthetic noise + voiced-burst signal is evaluated.
+
+    python -m benchmarks.eval_vad [file.wav ...]
+"""
+from __future__ import annotations
+
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+from src.vad import MIC_BATCH_FRAMES, VoiceActivityDetector
+
+SAMPLE_RATE = 24000
+FRAME_LENGTH = int(SAMPLE_RATE * 0.02)
+
+
+def load_wav(path: str) -> np.ndarray:
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM is supported")
+        rate = f.getframerate()
+        audio = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        audio = audio.reshape(-1, f.getnchannels()).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        positions = np.arange(int(len(audio) * SAMPLE_RATE / rate)) * rate / SAMPLE_RATE
+        audio = np.interp(positions, np.arange(len(audio)), audio)
+    return audio.astype(np.int16)
+
+
+def load_labels(path: str, n_frames: int) -> np.ndarray | None:
+    if not os.path.exists(path):
+        return None
+    labels = np.zeros(n_frames, dtype=bool)
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                start, end = (float(v) for v in line.split()[:2])
+                labels[int(start / 0.02) : int(np.ceil(end / 0.02))] = True
+    return labels
+
+
+def synthetic(seconds: float = 30.0, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    audio = rng.normal(0, 40, n)
+    labels = np.zeros(n // FRAME_LENGTH, dtype=bool)
+    t = 1.0
+    while t < seconds - 2:
+        length = rng.uniform(0.4, 1.5)
+        start, end = int(t * SAMPLE_RATE), int((t + length) * SAMPLE_RATE)
+        time_axis = np.arange(end - start) / SAMPLE_RATE
+        f0 = rng.uniform(110, 240)
+        voice = sum(np.sin(2 * np.pi * f0 * k * time_axis) / k for k in range(1, 8))
+        audio[start:end] += 2500 * voice * np.hanning(end - start) ** 0.3
+        labels[start // FRAME_LENGTH : end // FRAME_LENGTH] = True
+        t += length + rng.uniform(0.8, 3.0)
+    return np.clip(audio, -32768, 32767).astype(np.int16), labels
+
+
+def evaluate(name: str, audio: np.ndarray, labels: np.ndarray | None) -> None:
+    frames = audio[: len(audio) // FRAME_LENGTH * FRAME_LENGTH].reshape(-1, FRAME_LENGTH)
+    vad = VoiceActivityDetector()
+
+    start = time.process_time()
+    raw = vad.classify(frames)
+    cpu_batch = time.process_time() - start
+
+    vad = VoiceActivityDetector()
+    start = time.process_time()
+    sent = sum(len(vad.process(frame)) for frame in frames)
+    cpu_stream = time.process_time() - start
+
+    # the live path: MIC_BATCH_FRAMES capture frames per process_batch call
+    vad = VoiceActivityDetector()
+    rows = list(frames)
+    start = time.process_time()
+    for i in range(0, len(rows), MIC_BATCH_FRAMES):
+        for _ in vad.process_batch(rows[i : i + MIC_BATCH_FRAMES]):
+            pass
+    cpu_live = time.process_time() - start
+
+    seconds = len(frames) * 0.02
+    print(f"{name}: {seconds:.1f}s audio, {sent / len(frames):.0%} of frames sent upstream")
+    print(
+        f"  cpu: {cpu_batch / seconds * 1000:.2f} ms/s batched, {cpu_stream / seconds * 1000:.2f} ms/s per-frame, "
+        f"{cpu_live / seconds * 1000:.2f} ms/s in batches of {MIC_BATCH_FRAMES} (live path)"
+    )
+    if labels is not None:
+        labels = labels[: len(raw)]
+        tp = np.count_nonzero(raw & labels)
+        precision = tp / max(np.count_nonzero(raw), 1)
+        recall = tp / max(np.count_nonzero(labels), 1)
+        print(f"  raw frames: precision {precision:.3f}, recall {recall:.3f}")
+
+
+def main() -> None:
+    if len(sys.argv) == 1:
+        audio, labels = synthetic()
+        evaluate("synthetic", audio, labels)
+        return
+    for path in sys.argv[1:]:
+        audio = load_wav(path)
+        labels = load_labels(os.path.splitext(path)[0] + ".labels", len(audio) // FRAME_LENGTH)
+        evaluate(os.path.basename(path), audio, labels)
+
+
+if __name__ == "__main__":
+    main()
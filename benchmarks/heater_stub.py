@@ -0,0 +1,58 @@
+"""Local stand-in for the heater server (``GET /health`` and ``GET /``).
+
+    python -m benchmarks.heater_stub --port 28001 --delay 0.01
+"""
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class HeaterStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real server
+    disable_nagle_algorithm = True
+    delay_s = 0.0
+
+    def do_GET(self):  # noqa
+        time.sleep(self.delay_s)
+        if self.path == "/health":
+            body = b"ok"
+        elif self.path == "/":
+            body = b"triggered"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa
+        pass
+
+
+def start_stub(port: int = 0, delay_s: float = 0.0) -> ThreadingHTTPServer:
+    """Start the stub on a background thread and return the server (``server_port`` is bound)."""
+    handler = type("Handler", (HeaterStubHandler,), {"delay_s": delay_s})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=28001)
+    parser.add_argument("--delay", type=float, default=0.0)
+    args = parser.parse_args()
+    server = start_stub(args.port, args.delay)
+    print(f"heater stub listening on http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
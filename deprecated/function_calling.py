@@ -1,20 +1,35 @@
-from src.openai import Agent
+import asyncio
+import sys
 
+from src.memory import ConversationMemory, SQLiteMemoryStore
+from src.openai import AsyncAgent
 
-def main():
-    agent = Agent(
+# conversations are kept here; pass a session name as the first argument to resume one
+MEMORY_DB_PATH = "memory.sqlite3"
+
+
+async def main():
+    store = SQLiteMemoryStore(MEMORY_DB_PATH)
+    agent = AsyncAgent(
         "credentials/maiko-ai/openai.json",
         use_tools=True,
         model="gpt-4o-mini",
+        memory=ConversationMemory(store=store, session_id=sys.argv[1] if len(sys.argv) > 1 else "default"),
     )
     while True:
-        user_input = input("\nInput: ")
+        user_input = await asyncio.to_thread(input, "\nInput: ")
         if user_input.lower() == "quit":
             break
 
-        result = agent.process_user_input(user_input)
-        print(f"Output: {result}")
+        print("Output: ", end="", flush=True)
+        try:
+            async for delta in agent.stream(user_input):
+                print(delta, end="", flush=True)
+        except Exception as e:
+            print(f"エラーが発生しました / An error occurred: {str(e)}", end="")
+        print()
+    store.close()
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
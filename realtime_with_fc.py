@@ -3,28 +3,146 @@ from __future__ import annotations
 import base64
 import asyncio
 import json
-import os
-from typing import Any, cast
+import time
+from collections import deque
+from typing import Any, Callable
 import numpy as np
-from src.audio_util import CHANNELS, SAMPLE_RATE, AudioPlayerAsync
-from src.function_dict import get_tools, exec_tool
+from src.audio_util import (
+    AUDIO_FORMAT_PCM16,
+    CHUNK_LENGTH_S,
+    SAMPLE_RATE,
+    VOICE_EFFECTS,
+    AudioPlayerAsync,
+    SoundBank,
+)
+from src.capture import AudioBatcher, MicCapture, OVERFLOW_DROP_OLDEST, WireEncoder
+from src.function_dict import TOOL_CACHE, get_tools, is_tool_failure
+from src.metrics import JsonlExporter, MetricsRegistry, PrometheusExporter, TurnTracker
+from src.tool_executor import ToolExecutor
+from src.trace import TraceRecorder
+from src.transcript import TranscriptRenderer, TranscriptStore, create_textual_view
+from src.vad import MIC_BATCH_FRAMES, VoiceActivityDetector
+from src.wake_word import WakeWordStage, create_wake_word_stage
 from openai import AsyncOpenAI
-from openai.types.beta.realtime.session import Session
 from openai.resources.beta.realtime.realtime import AsyncRealtimeConnection
+from websockets.exceptions import ConnectionClosed
 
-# when user + ai are silent for 5 seconds, exit for api cost reduction
+# when user + ai are silent for 5 seconds, close the websocket for api cost reduction
 SILENCE_SECONDS = 5
 RMS_THRESHOLD = 50
+# mic frames buffered while the websocket is slow (50 x 20ms = 1s), then the oldest are dropped
+MIC_QUEUE_FRAMES = 50
+MIC_OVERFLOW_POLICY = OVERFLOW_DROP_OLDEST
+# wire format both ways: "pcm16" (24kHz) or "g711_ulaw"/"g711_alaw" (8kHz, ~1/6 of the bytes)
+AUDIO_FORMAT = AUDIO_FORMAT_PCM16
+# mic frames are merged into one input_audio_buffer.append up to this delay / size
+UPLINK_MAX_LATENCY_S = 0.1
+UPLINK_MAX_BYTES = 9600
+# threads available to blocking tools (HTTP, Firebase, nested LLM calls)
+TOOL_WORKERS = 4
+# speech captured while suspended/resuming is replayed once the session is ready (10s max)
+RESUME_BUFFER_FRAMES = 500
+# a local VAD onset this recent is taken as the start of a barge-in
+BARGE_IN_ONSET_WINDOW_S = 1.5
+# transcript display: "plain" terminal line or "textual" full-screen view
+TRANSCRIPT_VIEW = "plain"
+TRANSCRIPT_FPS = 10
+TRANSCRIPT_MAX_ITEMS = 16
+# finished transcripts are appended here as JSONL when set
+TRANSCRIPT_LOG_PATH = None
+# metrics: Prometheus text on http://METRICS_HOST:METRICS_PORT/metrics, JSONL when a path is set
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464
+METRICS_JSONL_PATH = None
+# how long after response.done to wait for the first playback block before closing the turn
+PLAYBACK_GRACE_S = 1.0
+# "porcupine", "energy" (local test detector) or None to resume on any speech
+WAKE_WORD_BACKEND = "porcupine"
+# sound effects decoded once at startup; the chime plays on the effects voice when woken
+SOUNDS_DIR = "sounds"
+WAKE_CHIME = "yoo"
+# received server events are written here as a replayable trace for src.fake_realtime when set
+EVENT_TRACE_PATH = None
+# read while the websocket connects and put into the instructions, so the
+# first turn usually needs no tool round trip; refreshed while connected
+PREFETCH_TOOLS = ("get_current_users", "get_whiteboard_data", "check_heater_health")
+# how long session.created waits for the prefetch before configuring without it
+PREFETCH_WAIT_S = 0.3
+PREFETCH_REFRESH_S = 15
+# longer results are cut and marked as partial, so the model calls the tool for the rest
+PREFETCH_MAX_CHARS = 800
+
+STATE_ACTIVE = "active"
+STATE_SUSPENDED = "suspended"
+STATE_RESUMING = "resuming"
 
 class RealtimeApp:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        wake_word: WakeWordStage | None = None,
+        metrics: MetricsRegistry | None = None,
+        client: AsyncOpenAI | None = None,
+        audio_player: AudioPlayerAsync | None = None,
+        tool_executor: ToolExecutor | None = None,
+        capture: MicCapture | None = None,
+        sounds: SoundBank | None = None,
+        audio_format: str = AUDIO_FORMAT,
+        input_device: int | None = None,
+        output_device: int | None = None,
+    ) -> None:
         self.connection = None
         self.session = None
-        self.client = AsyncOpenAI(api_key=self._load_access_key("credentials/maiko-ai/openai.json"))
-        self.audio_player = AudioPlayerAsync()
+        # everything below can be injected to run against src.fake_realtime without devices
+        if client is None:
+            client = AsyncOpenAI(api_key=self._load_access_key("credentials/maiko-ai/openai.json"))
+        self.client = client
+        # an injected player must decode the same audio_format
+        if audio_player is None:
+            audio_player = AudioPlayerAsync(audio_format=audio_format, device=output_device)
+        self.audio_player = audio_player
+        self.encoder = WireEncoder(audio_format)
+        self.tool_executor = tool_executor if tool_executor is not None else ToolExecutor(max_workers=TOOL_WORKERS)
+        self.capture = capture
+        # devices left as None are asked for on the terminal
+        self.input_device = input_device
+        self.sounds = sounds if sounds is not None else SoundBank(SOUNDS_DIR)
+        self.trace_recorder = TraceRecorder(EVENT_TRACE_PATH) if EVENT_TRACE_PATH else None
+        self.batcher = AudioBatcher(max_latency_s=UPLINK_MAX_LATENCY_S, max_bytes=UPLINK_MAX_BYTES)
+        self.vad = VoiceActivityDetector(min_rms=RMS_THRESHOLD)
         self.last_audio_item_id = None
+        self.current_response_id = None
+        self.interrupted_response_id = None
         self.should_send_audio = asyncio.Event()
         self.connected = asyncio.Event()
+        # without a wake word the first connection is opened right away and later
+        # ones when speech resumes the session; with one, only on detection
+        self.wake_word = wake_word
+        self.state = STATE_RESUMING if wake_word is None else STATE_SUSPENDED
+        self.wake = asyncio.Event()
+        if wake_word is None:
+            self.wake.set()
+        self.wake_kind = "cold"
+        self.wake_time = time.monotonic()
+        self.resume_buffer: deque[np.ndarray] = deque(maxlen=RESUME_BUFFER_FRAMES)
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self.turn = TurnTracker(self.metrics)
+        self.tool_calls: dict[str, list[tuple[str, asyncio.Task]]] = {}
+        # tool outputs still being sent; like tool_calls, they keep the session from idling out
+        self.pending_tool_outputs: set[asyncio.Task] = set()
+        self.awaiting_first_audio = True
+        self.event_handlers = {
+            "session.created": self._on_session_created,
+            "session.updated": self._on_session_updated,
+            "input_audio_buffer.speech_started": self._barge_in,
+            "input_audio_buffer.speech_stopped": self._on_speech_stopped,
+            "response.created": self._on_response_created,
+            "response.audio.delta": self._on_audio_delta,
+            "response.audio.done": self._on_audio_done,
+            "response.audio_transcript.delta": self._on_transcript_delta,
+            "response.output_item.done": self._on_output_item_done,
+            "response.done": self._on_response_done,
+        }
+        self.transcripts = TranscriptStore(max_items=TRANSCRIPT_MAX_ITEMS, log_path=TRANSCRIPT_LOG_PATH)
         self.is_recording = False
         self.silence_detected = False
         self.silence_start_time = None
@@ -36,6 +154,25 @@ class RealtimeApp:
         丁寧すぎない表現にとどめ、冷淡な雰囲気を維持する。
         例：- 「そうどすか。」- 「うちには関係あらへんえ。」- 「要るなら持っていきやす。」
         """
+        # the instructions keep the last snapshot across sessions, so a resume starts from it
+        self.prefetch: asyncio.Task | None = None
+        self.sent_instructions: str | None = None
+        # built once, the tool schema list is cached by function_dict
+        self.session_config = {
+            "instructions": self.instruction,
+            "turn_detection": {
+                "type": "server_vad",
+                "threshold": 0.5,
+                "prefix_padding_ms": 300,
+                "silence_duration_ms": 500,
+                "create_response": True
+            },
+            "voice": "sage",
+            "input_audio_format": audio_format,
+            "output_audio_format": audio_format,
+            "tools": get_tools(),
+            "tool_choice": "auto",
+        }
         
         
 
@@ -49,80 +186,265 @@ class RealtimeApp:
             )
 
     async def handle_realtime_connection(self) -> None:
-        async with self.client.beta.realtime.connect(
-                model="gpt-4o-mini-realtime-preview-2024-12-17",
-            ) as conn:
-            self.connection = conn
-            self.connected.set()
-            print("Connected to realtime session")
-            acc_items: dict[str, Any] = {}
-
-            async for event in conn:
-                if event.type == "session.created":
-                    self.session = event.session
-                    print(f"Session created with ID: {event.session.id}")
-
-                    await conn.session.update(session={
-                        "instructions": self.instruction,  
-                        "turn_detection": {
-                            "type": "server_vad",
-                            "threshold": 0.5,
-                            "prefix_padding_ms": 300,
-                            "silence_duration_ms": 500,
-                            "create_response": True
-                        },
-                        "voice": "sage",
-                        "tools": get_tools(), 
-                        "tool_choice": "auto",
-                    })
-                    continue
-
-                if event.type == "session.updated":
-                    self.session = event.session
-                    print("Session updated")
-                    continue
-
-                if event.type == "response.audio.delta":
-                    if event.item_id != self.last_audio_item_id:
-                        self.audio_player.reset_frame_count()
-                        self.last_audio_item_id = event.item_id
-
-                    bytes_data = base64.b64decode(event.delta)
-                    self.audio_player.add_data(bytes_data)
-                    continue
-
-                if event.type == "response.audio_transcript.delta":
-                    try:
-                        text = acc_items[event.item_id]
-                    except KeyError:
-                        acc_items[event.item_id] = event.delta
-                    else:
-                        acc_items[event.item_id] = text + event.delta
-
-                    print(f"\rTranscript: {acc_items[event.item_id]}")
-                    # self.audio_player.clear_data()
-                    continue
-
-                if event.type == "response.output_item.done":
-                    item = event.item
-                    print(item)
-                    if item.type == "function_call":
-                        function_name = item.name
-                        call_id = item.call_id
-                        arguments_str = item.arguments
-                        try:
-                            arguments = json.loads(arguments_str)
-                        except json.JSONDecodeError:
-                            arguments = {}
-
-                        result = exec_tool(function_name, arguments)
-
-                        await conn.conversation.item.create(item={
-                            "type": "function_call_output",
-                            "call_id": call_id,
-                            "output": json.dumps(result, ensure_ascii=False)
-                        })
-                        await conn.response.create()
+        self.state = STATE_RESUMING
+        # runs during the websocket handshake
+        self.prefetch = asyncio.create_task(self._prefetch_context())
+        refresh = None
+        try:
+            async with self.client.beta.realtime.connect(
+                    model="gpt-4o-mini-realtime-preview-2024-12-17",
+                ) as conn:
+                self.connection = conn
+                print("Connected to realtime session")
+                self.tool_calls = {}
+                self.current_response_id = None
+                self.awaiting_first_audio = True
+                refresh = asyncio.create_task(self._refresh_context(conn))
+
+                async for event in conn:
+                    if self.trace_recorder is not None:
+                        self.trace_recorder.record(event)
+                    handler = self.event_handlers.get(event.type)
+                    if handler is None:
+                        continue
+                    started = time.perf_counter()
+                    await handler(conn, event)
+                    self.metrics.observe("event_handler_seconds", time.perf_counter() - started, event_type=event.type)
+        finally:
+            # refresh may have replaced self.prefetch, so cancel it first
+            if refresh is not None:
+                refresh.cancel()
+            self.prefetch.cancel()
+
+    async def _prefetch_context(self) -> str:
+        """Run PREFETCH_TOOLS concurrently and render a compact snapshot for the instructions."""
+        started = time.monotonic()
+        results = await asyncio.gather(*(self.tool_executor.run(name, {}) for name in PREFETCH_TOOLS))
+        lines = []
+        for name, result in zip(PREFETCH_TOOLS, results):
+            text = str(result).strip()
+            # failures are left out, the model can still call the tool itself
+            if text and not is_tool_failure(result):
+                if len(text) > PREFETCH_MAX_CHARS:
+                    # a partial board must not pass for the whole one; point the model at the tool
+                    text = text[:PREFETCH_MAX_CHARS].rstrip() + f"\n…（途中まで。続きが必要な質問には {name} を呼ぶこと）"
+                lines.append(f"[{name}]\n{text}")
+        self.metrics.observe("context_prefetch_seconds", time.monotonic() - started)
+        return "\n".join(lines)
+
+    def _apply_context(self, snapshot: str) -> None:
+        instructions = self.instruction
+        if snapshot:
+            instructions += (
+                "\n現在の状況（自動取得済み。これで答えられる質問にはツールを呼ばずに答えること）:\n" + snapshot
+            )
+        self.session_config["instructions"] = instructions
+
+    async def _refresh_context(self, conn: AsyncRealtimeConnection) -> None:
+        """Send the instructions again whenever a newer snapshot differs from the one in use."""
+        while True:
+            try:
+                self._apply_context(await self.prefetch)
+            except Exception as e:
+                print(f"Context prefetch failed: {e}")
+            else:
+                # usually the initial session.update already carried this snapshot
+                await self.connected.wait()
+                if self.session_config["instructions"] != self.sent_instructions:
+                    await conn.session.update(session={"instructions": self.session_config["instructions"]})
+                    self.sent_instructions = self.session_config["instructions"]
+                    print("Context refreshed")
+            await asyncio.sleep(PREFETCH_REFRESH_S)
+            self.prefetch = asyncio.create_task(self._prefetch_context())
+
+    async def _on_session_created(self, conn: AsyncRealtimeConnection, event) -> None:
+        self.session = event.session
+        print(f"Session created with ID: {event.session.id}")
+
+        # the handshake usually covers the prefetch; if not, _refresh_context sends it later
+        done, _ = await asyncio.wait({self.prefetch}, timeout=PREFETCH_WAIT_S)
+        if done and not self.prefetch.cancelled() and self.prefetch.exception() is None:
+            self._apply_context(self.prefetch.result())
+        await conn.session.update(session=self.session_config)
+        self.sent_instructions = self.session_config["instructions"]
+        await self._replay_resume_buffer(conn)
+        self.state = STATE_ACTIVE
+        self.connected.set()
+        self._record_latency("session_ready")
+
+    async def _on_session_updated(self, conn: AsyncRealtimeConnection, event) -> None:
+        self.session = event.session
+        print("Session updated")
+
+    async def _on_speech_stopped(self, conn: AsyncRealtimeConnection, event) -> None:
+        self.turn.start_turn()
+        self.audio_player.reset_playback_stamp()
+
+    async def _on_response_created(self, conn: AsyncRealtimeConnection, event) -> None:
+        self.current_response_id = event.response.id
+        self.turn.mark("response_created")
+
+    async def _on_audio_delta(self, conn: AsyncRealtimeConnection, event) -> None:
+        if event.response_id == self.interrupted_response_id:
+            # deltas still in flight from a response we cancelled
+            return
+        self.turn.mark_once("first_audio_delta")
+        if self.awaiting_first_audio:
+            self._record_latency("first_audio")
+            self.awaiting_first_audio = False
+        if event.item_id != self.last_audio_item_id:
+            self.audio_player.begin_item()
+            self.last_audio_item_id = event.item_id
+
+        bytes_data = base64.b64decode(event.delta)
+        self.audio_player.add_data(bytes_data)
+
+    async def _on_audio_done(self, conn: AsyncRealtimeConnection, event) -> None:
+        # lets the jitter buffer play out a tail shorter than its target depth
+        self.audio_player.end_item()
+
+    async def _on_transcript_delta(self, conn: AsyncRealtimeConnection, event) -> None:
+        # rendered by TranscriptRenderer at a fixed frame rate, not per delta
+        self.transcripts.append(event.response_id, event.item_id, event.delta)
+
+    async def _on_output_item_done(self, conn: AsyncRealtimeConnection, event) -> None:
+        item = event.item
+        print(item)
+        if item.type == "function_call":
+            function_name = item.name
+            arguments_str = item.arguments
+            try:
+                arguments = json.loads(arguments_str)
+            except json.JSONDecodeError:
+                arguments = {}
+
+            # start right away so calls from the same response overlap
+            task = asyncio.create_task(self._run_tool(function_name, arguments))
+            self.tool_calls.setdefault(event.response_id, []).append((item.call_id, task))
+
+    async def _on_response_done(self, conn: AsyncRealtimeConnection, event) -> None:
+        if event.response.id == self.current_response_id:
+            self.current_response_id = None
+        self.transcripts.finish_response(event.response.id)
+        self.turn.mark("response_done")
+        calls = self.tool_calls.pop(event.response.id, None)
+        if calls:
+            task = asyncio.create_task(self._send_tool_outputs(conn, calls))
+            self.pending_tool_outputs.add(task)
+            task.add_done_callback(self.pending_tool_outputs.discard)
+        else:
+            # the first playback block may still be waiting in the device buffer;
+            # detached so a quick next turn does not overwrite this one's marks
+            turn = self.turn.detach()
+            asyncio.get_running_loop().call_later(
+                PLAYBACK_GRACE_S, lambda: turn.finish_turn(self.audio_player.playback_started_at)
+            )
+
+    async def _run_tool(self, function_name: str, arguments: dict) -> Any:
+        started = time.monotonic()
+        try:
+            return await self.tool_executor.run(function_name, arguments)
+        finally:
+            self.turn.add_tool_call(function_name, started, time.monotonic())
+
+    async def _barge_in(self, conn: AsyncRealtimeConnection, event=None) -> None:
+        # server VAD reports the onset late, our own VAD saw it first if it fired recently
+        now = time.monotonic()
+        onset = self.vad.onset_time
+        if onset is None or now - onset > BARGE_IN_ONSET_WINDOW_S:
+            onset = now
+
+        played_frames, had_audio = self.audio_player.interrupt()
+        if self.current_response_id is not None:
+            self.interrupted_response_id = self.current_response_id
+            await conn.response.cancel()
+        if had_audio and self.last_audio_item_id is not None:
+            # make the server's copy of the item end where the listener stopped hearing it
+            await conn.conversation.item.truncate(
+                item_id=self.last_audio_item_id,
+                content_index=0,
+                audio_end_ms=played_frames * 1000 // SAMPLE_RATE,
+            )
+            asyncio.create_task(self._record_interruption(onset))
+
+    async def _record_interruption(self, onset: float) -> None:
+        for _ in range(20):
+            await asyncio.sleep(CHUNK_LENGTH_S)
+            if self.audio_player.silenced_at is not None:
+                elapsed = self.audio_player.silenced_at - onset
+                self.metrics.observe("interruption_seconds", elapsed)
+                print(f"⏱ interruption: {elapsed * 1000:.0f} ms")
+                return
+
+    async def _replay_resume_buffer(self, conn: AsyncRealtimeConnection) -> None:
+        # frames captured during the appends land in the buffer too, so drain until it stays empty
+        while self.resume_buffer:
+            frames = list(self.resume_buffer)
+            self.resume_buffer.clear()
+            for start in range(0, len(frames), 50):
+                chunk = self.encoder.encode(b"".join(frame.tobytes() for frame in frames[start : start + 50]))
+                await conn.input_audio_buffer.append(audio=base64.b64encode(chunk).decode("utf-8"))
+
+    def _record_latency(self, name: str) -> None:
+        elapsed = time.monotonic() - self.wake_time
+        self.metrics.observe(f"wake_to_{name}_seconds", elapsed, wake=self.wake_kind)
+        print(f"⏱ {self.wake_kind} wake to {name}: {elapsed * 1000:.0f} ms")
+
+    async def suspend(self) -> None:
+        """Close the websocket but keep audio devices, clients and caches open."""
+        self.state = STATE_SUSPENDED
+        # speech or a wake-word pre-roll arriving during the teardown belongs to the next
+        # session; a fresh buffer keeps it apart from what _connection_loop drops
+        self.resume_buffer = deque(maxlen=RESUME_BUFFER_FRAMES)
+        self.connected.clear()
+        self.batcher.end_speech()
+        if self.connection is not None:
+            await self.connection.close()
+        print("💤 Session suspended")
+
+    def resume(self) -> None:
+        self.state = STATE_RESUMING
+        # the first connection is still a cold start when a wake word gates it
+        self.wake_kind = "resume" if self.session is not None else "cold"
+        self.wake_time = time.monotonic()
+        self.wake.set()
+        print("🔔 Resuming session")
+
+    async def _connection_loop(self) -> None:
+        while True:
+            await self.wake.wait()
+            self.wake.clear()
+            attempt_buffer = self.resume_buffer
+            try:
+                await self.handle_realtime_connection()
+            except Exception as e:
+                print(f"Realtime connection error: {e}")
+            self.connection = None
+            self.connected.clear()
+            # speech buffered for this session (or a failed connect) is stale for the next one
+            attempt_buffer.clear()
+            # unless resume() already ran during the teardown, the next speech reconnects
+            if not self.wake.is_set():
+                self.state = STATE_SUSPENDED
+
+    async def _send_tool_outputs(
+        self, conn: AsyncRealtimeConnection, calls: list[tuple[str, asyncio.Task]]
+    ) -> None:
+        try:
+            for call_id, task in calls:
+                result = await task
+                await conn.conversation.item.create(item={
+                    "type": "function_call_output",
+                    "call_id": call_id,
+                    "output": json.dumps(result, ensure_ascii=False)
+                })
+            await conn.response.create()
+        except ConnectionClosed as e:
+            print(f"Tool outputs not sent, connection closed: {e}")
+
+    def _is_busy(self) -> bool:
+        """A response or tool call is still under way, so silence is not idleness."""
+        return bool(self.tool_calls or self.pending_tool_outputs) or self.current_response_id is not None
 
     async def _get_connection(self) -> AsyncRealtimeConnection:
         await self.connected.wait()
@@ -130,79 +452,120 @@ class RealtimeApp:
         return self.connection
 
     async def send_mic_audio(self) -> None:
-        import sounddevice as sd
-
         sent_audio = False
-        device_info = sd.query_devices()
-        print("Available audio devices:")
-        print(device_info)
+        if self.capture is None:
+            if self.input_device is None:
+                import sounddevice as sd
 
-        read_size = int(SAMPLE_RATE * 0.02)
+                device_info = sd.query_devices()
+                print("Available audio devices:")
+                print(device_info)
 
-        input_device_index = int(input("Enter the index of the input device: "))
+                self.input_device = int(input("Enter the index of the input device: "))
 
-        stream = sd.InputStream(
-            channels=CHANNELS,
-            samplerate=SAMPLE_RATE,
-            dtype="int16",
-            device=input_device_index
-        )
-        stream.start()
+            # capture runs on the PortAudio callback thread; this task only drains the queue
+            self.capture = MicCapture(
+                device=self.input_device,
+                queue_frames=MIC_QUEUE_FRAMES,
+                overflow=MIC_OVERFLOW_POLICY,
+            )
+        self.capture.start()
 
         try:
             while True:
-                if stream.read_available < read_size:
-                    await asyncio.sleep(0)
-                    continue
+                # every queued frame at once, so the VAD features are one batched FFT
+                audio_batch = await self.capture.read_batch(MIC_BATCH_FRAMES)
 
                 await self.should_send_audio.wait()
-                if not self.is_recording:
-                    print("🔴 Recording started...")
-                    self.is_recording = True
-
-                data, _ = stream.read(read_size)
-
-                connection = await self._get_connection()
-                if not sent_audio:
-                    asyncio.create_task(connection.send({"type": "response.cancel"}))
-                    sent_audio = True
-
-                await connection.input_audio_buffer.append(audio=base64.b64encode(cast(Any, data)).decode("utf-8"))
-                await asyncio.sleep(0)
-                audio_data = np.frombuffer(data, dtype=np.int16)
-                rms = np.sqrt(np.mean(np.square(audio_data)))
-                silence_threshold = RMS_THRESHOLD
-
-                if len(self.audio_player.queue) > 0:
-                    self.silence_detected = False
-                    self.silence_start_time = None
-                    continue
+                # only speech plus pre-roll/hangover padding goes upstream
+                for audio_data, frames in self.vad.process_batch(audio_batch):
+                    if not self.is_recording:
+                        print("🔴 Recording started...")
+                        self.is_recording = True
+
+                    if self.state == STATE_SUSPENDED and self.wake_word is not None:
+                        # the wake word stage sees every frame; speech alone does not wake us
+                        if self.wake_word.feed(audio_data):
+                            print("👂 Wake word detected")
+                            if WAKE_CHIME in self.sounds:
+                                self.audio_player.play(self.sounds[WAKE_CHIME], voice=VOICE_EFFECTS)
+                            self.resume_buffer.append(self.wake_word.take_preroll())
+                            self.vad.clear_preroll()
+                            self.resume()
+                        continue
+
+                    if self.state != STATE_ACTIVE:
+                        # keep the utterance that woke us so the new session hears it
+                        if frames:
+                            self.resume_buffer.extend(frames)
+                            if self.state == STATE_SUSPENDED:
+                                self.resume()
+                        continue
+
+                    connection = await self._get_connection()
+                    if not sent_audio:
+                        asyncio.create_task(connection.send({"type": "response.cancel"}))
+                        sent_audio = True
+
+                    if frames:
+                        # pre-roll frames are batched together with the onset frame, which flushes them
+                        chunks = [
+                            self.batcher.add(frame, is_speech=i == len(frames) - 1)
+                            for i, frame in enumerate(frames)
+                        ]
+                    else:
+                        chunks = [self.batcher.end_speech()]
+                    for chunk in chunks:
+                        if chunk is not None:
+                            payload = self.encoder.encode(chunk)
+                            await connection.input_audio_buffer.append(audio=base64.b64encode(payload).decode("utf-8"))
+
+                    if len(self.audio_player.queue) > 0 or self._is_busy():
+                        self.silence_detected = False
+                        self.silence_start_time = None
+                        continue
                 
-                if rms < silence_threshold:
-                    if not self.silence_detected:
-                        self.silence_detected = True
-                        self.silence_start_time = asyncio.get_event_loop().time()
+                    if not self.vad.in_speech:
+                        if not self.silence_detected:
+                            self.silence_detected = True
+                            self.silence_start_time = asyncio.get_event_loop().time()
+                        else:
+                            if asyncio.get_event_loop().time() - self.silence_start_time > SILENCE_SECONDS:
+                                print(f"{SILENCE_SECONDS} seconds of silence detected, suspending...")
+                                print(f"Capture stats: {self.capture.stats()}")
+                                print(f"Uplink stats: {self.batcher.stats()}")
+                                print(f"Playback stats: {self.audio_player.stats()}")
+                                print(f"Tool cache stats: {TOOL_CACHE.stats()}")
+                                await self.suspend()
+                                self.silence_detected = False
+                                sent_audio = False
                     else:
-                        if asyncio.get_event_loop().time() - self.silence_start_time > SILENCE_SECONDS:
-                            print(f"{SILENCE_SECONDS} seconds of silence detected, exiting...")
-                            os._exit(1)
-                else:
-                    self.silence_detected = False
+                        self.silence_detected = False
 
         except KeyboardInterrupt:
             print("\nRecording stopped")
         finally:
-            stream.stop()
-            stream.close()
+            self.capture.stop()
+            self.capture.close()
 
-    async def run(self):
+    async def run(self, transcript_sink: Callable[[str], None] | None = None):
         print("Starting realtime conversation...")
         print("Press Ctrl+C to stop recording and exit")
         
         tasks = [
-            asyncio.create_task(self.handle_realtime_connection()),
+            asyncio.create_task(self._connection_loop()),
             asyncio.create_task(self.send_mic_audio())
         ]
+        if transcript_sink is not None:
+            # e.g. the supervisor's per-room line
+            renderer = TranscriptRenderer(self.transcripts, fps=TRANSCRIPT_FPS, sink=transcript_sink)
+        elif TRANSCRIPT_VIEW == "textual":
+            view, sink = create_textual_view()
+            tasks.append(asyncio.create_task(view.run_async()))
+            renderer = TranscriptRenderer(self.transcripts, fps=TRANSCRIPT_FPS, sink=sink)
+        else:
+            renderer = TranscriptRenderer(self.transcripts, fps=TRANSCRIPT_FPS)
+        tasks.append(asyncio.create_task(renderer.run()))
         
         self.should_send_audio.set()  # Start recording immediately
         
@@ -210,7 +573,28 @@ class RealtimeApp:
             await asyncio.gather(*tasks)
         except KeyboardInterrupt:
             print("\nExiting...")
+        finally:
+            # gather leaves the other tasks running when one fails (e.g. the mic went away);
+            # stop them all so no connection stays open without the idle timer
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+async def main() -> None:
+    exporters = [JsonlExporter(METRICS_JSONL_PATH)] if METRICS_JSONL_PATH else []
+    app = RealtimeApp(
+        wake_word=create_wake_word_stage(WAKE_WORD_BACKEND, SAMPLE_RATE),
+        metrics=MetricsRegistry(exporters),
+    )
+    if METRICS_PORT is not None:
+        await PrometheusExporter(lambda: [app.metrics], METRICS_HOST, METRICS_PORT).start()
+    try:
+        await app.run()
+    finally:
+        # writes the observations still buffered
+        for exporter in exporters:
+            exporter.close()
+
 
 if __name__ == "__main__":
-    app = RealtimeApp()
-    asyncio.run(app.run())
+    asyncio.run(main())
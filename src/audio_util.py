@@ -5,24 +5,126 @@ import base64
 import asyncio
 import os
 import threading
-from typing import Callable, Awaitable
+import wave
+from time import monotonic
+from typing import Any, BinaryIO, Callable, Awaitable, Iterator
 
 import numpy as np
-import pyaudio
-import sounddevice as sd
-from pydub import AudioSegment
 
 from openai.resources.beta.realtime.realtime import AsyncRealtimeConnection
 
+from src.g711 import CODECS, G711_RATE
+from src.resample import PolyphaseResampler, to_int16
+from src.ring_buffer import RingBuffer
+
 CHUNK_LENGTH_S = 0.05  # 100ms
 SAMPLE_RATE = 24000
-FORMAT = pyaudio.paInt16
+# initial playback backlog capacity, grows on the writer side if exceeded
+PLAYBACK_BUFFER_S = 30
+FORMAT = 8  # pyaudio.paInt16
 CHANNELS = 1
+# session input/output_audio_format values; G.711 runs at 8kHz and is resampled at the edges
+AUDIO_FORMAT_PCM16 = "pcm16"
+AUDIO_FORMAT_ULAW = "g711_ulaw"
+AUDIO_FORMAT_ALAW = "g711_alaw"
+AUDIO_FORMATS = (AUDIO_FORMAT_PCM16, AUDIO_FORMAT_ULAW, AUDIO_FORMAT_ALAW)
+# jitter buffer for assistant speech: an item starts playing once the target depth is queued;
+# the target starts at JITTER_INITIAL_S and adapts to delta arrival jitter within [MIN, MAX]
+JITTER_INITIAL_S = 0.1
+JITTER_MIN_S = 0.04
+JITTER_MAX_S = 0.5
+# pcm16 bytes per input_audio_buffer.append when streaming files (1s at 24kHz)
+APPEND_CHUNK_BYTES = 48000
+# input frames decoded per read when streaming files
+DECODE_CHUNK_FRAMES = 65536
 
 # pyright: reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false
 
 
+def _to_float(raw: bytes, sample_width: int, channels: int) -> np.ndarray:
+    """Little-endian PCM frames to mono float32 in int16 scale."""
+    if sample_width == 1:
+        x = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) * 256.0
+    elif sample_width == 2:
+        x = np.frombuffer(raw, dtype="<i2").astype(np.float32)
+    elif sample_width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        x = ((b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8 >> 8).astype(np.float32) / 256.0
+    elif sample_width == 4:
+        x = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 65536.0
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width}")
+    if channels > 1:
+        x = x.reshape(-1, channels).mean(axis=1)
+    return x
+
+
+def iter_pcm16_chunks(
+    source: str | bytes | BinaryIO,
+    raw_format: tuple[int, int, int] | None = None,
+    chunk_bytes: int = APPEND_CHUNK_BYTES,
+) -> Iterator[bytes]:
+    """Stream a WAV file (or headerless PCM) as 24kHz mono pcm16 chunks of ``chunk_bytes``.
+
+    ``source`` is a path, the file contents or a binary file object. For raw
+    PCM pass ``raw_format=(sample_rate, channels, sample_width)``. Input is read
+    ``DECODE_CHUNK_FRAMES`` at a time, so memory stays bounded for long files.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    opened = isinstance(source, str)
+    f = open(source, "rb") if opened else source
+    try:
+        if raw_format is None:
+            reader = wave.open(f, "rb")
+            rate, channels, width = reader.getframerate(), reader.getnchannels(), reader.getsampwidth()
+            read = reader.readframes
+        else:
+            rate, channels, width = raw_format
+
+            def read(n: int) -> bytes:
+                return f.read(n * channels * width)
+
+        resampler = PolyphaseResampler(rate, SAMPLE_RATE)
+        pending = bytearray()
+        while True:
+            raw = read(DECODE_CHUNK_FRAMES)
+            if raw:
+                pending += to_int16(resampler.process(_to_float(raw, width, channels))).tobytes()
+            else:
+                pending += to_int16(resampler.flush()).tobytes()
+            while len(pending) >= chunk_bytes:
+                yield bytes(pending[:chunk_bytes])
+                del pending[:chunk_bytes]
+            if not raw:
+                break
+        if pending:
+            yield bytes(pending)
+    finally:
+        if opened:
+            f.close()
+
+
+def iter_pcm16_base64(
+    source: str | bytes | BinaryIO,
+    raw_format: tuple[int, int, int] | None = None,
+    chunk_bytes: int = APPEND_CHUNK_BYTES,
+) -> Iterator[str]:
+    """``iter_pcm16_chunks`` encoded for ``input_audio_buffer.append``."""
+    for chunk in iter_pcm16_chunks(source, raw_format, chunk_bytes):
+        yield base64.b64encode(chunk).decode("utf-8")
+
+
 def audio_to_pcm16_base64(audio_bytes: bytes) -> bytes:
+    """Decode a whole file to 24kHz mono pcm16 bytes (not base64, despite the name).
+
+    WAV goes through the streaming decoder; other formats need pydub and ffmpeg.
+    """
+    if audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE":
+        return b"".join(iter_pcm16_chunks(audio_bytes))
+
+    from pydub import AudioSegment
+
     # load the audio file from the byte stream
     audio = AudioSegment.from_file(io.BytesIO(audio_bytes))
     print(f"Loaded audio: {audio.frame_rate=} {audio.channels=} {audio.sample_width=} {audio.frame_width=}")
@@ -31,64 +133,396 @@ def audio_to_pcm16_base64(audio_bytes: bytes) -> bytes:
     return pcm_audio
 
 
+VOICE_ASSISTANT = "assistant"
+VOICE_EFFECTS = "effects"
+VOICE_FILLER = "filler"
+
+
+class Voice:
+    """One mixer input: a sample FIFO with its own gain.
+
+    While any voice with ``ducks_others`` has audio queued, the other voices
+    are attenuated by their ``duck_gain``. Gain changes are ramped over one
+    block to avoid clicks. ``interruptible`` voices are flushed on barge-in.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        gain: float = 1.0,
+        duck_gain: float = 1.0,
+        ducks_others: bool = False,
+        interruptible: bool = False,
+        buffer_s: float = 5.0,
+    ):
+        self.name = name
+        self.gain = gain
+        self.duck_gain = duck_gain
+        self.ducks_others = ducks_others
+        self.interruptible = interruptible
+        self.queue = RingBuffer(int(buffer_s * SAMPLE_RATE), dtype=np.int16)
+        # None until the first block after the voice was silent, which starts at the target gain
+        self.applied_gain: float | None = gain
+
+    def write(self, samples: np.ndarray) -> None:
+        if len(self.queue) == 0:
+            self.applied_gain = None
+        self.queue.write(samples)
+
+
+def default_voices() -> list[Voice]:
+    return [
+        Voice(VOICE_ASSISTANT, ducks_others=True, interruptible=True, buffer_s=PLAYBACK_BUFFER_S),
+        Voice(VOICE_EFFECTS, gain=0.8, duck_gain=0.5),
+        Voice(VOICE_FILLER, gain=0.6, duck_gain=0.0, interruptible=True),
+    ]
+
+
+class SoundBank:
+    """Sound effects decoded once to 24kHz mono int16 and shared read-only.
+
+    Loads every ``.wav`` in ``directory`` (other formats through pydub when no
+    WAV with the same name exists), keyed by file stem.
+    """
+
+    def __init__(self, directory: str = "sounds"):
+        self.sounds: dict[str, np.ndarray] = {}
+        if not os.path.isdir(directory):
+            return
+        for filename in sorted(os.listdir(directory), key=lambda f: not f.endswith(".wav")):
+            name, ext = os.path.splitext(filename)
+            if name in self.sounds or ext not in (".wav", ".mp3", ".ogg", ".flac"):
+                continue
+            try:
+                with open(os.path.join(directory, filename), "rb") as f:
+                    samples = np.frombuffer(audio_to_pcm16_base64(f.read()), dtype=np.int16)
+            except Exception as e:
+                print(f"Failed to load sound {filename}: {e}")
+                continue
+            samples.flags.writeable = False
+            self.sounds[name] = samples
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.sounds
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.sounds[name]
+
+
+class WireDecoder:
+    """Session ``output_audio_format`` bytes to device-rate int16 samples.
+
+    pcm16 is only reinterpreted. G.711 is table-decoded and resampled from 8kHz
+    with a streaming resampler, which ``flush`` drains at the end of an item.
+    """
+
+    def __init__(self, audio_format: str = AUDIO_FORMAT_PCM16):
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"Unknown audio format: {audio_format}")
+        self.audio_format = audio_format
+        self._decode = CODECS[audio_format][1] if audio_format in CODECS else None
+        self.reset()
+
+    def reset(self) -> None:
+        self._resampler = PolyphaseResampler(G711_RATE, SAMPLE_RATE) if self._decode else None
+
+    def decode(self, data: bytes) -> np.ndarray:
+        if self._decode is None:
+            return np.frombuffer(data, dtype=np.int16)
+        return to_int16(self._resampler.process(self._decode(data)))
+
+    def flush(self) -> np.ndarray:
+        if self._resampler is None:
+            return np.empty(0, dtype=np.int16)
+        tail = to_int16(self._resampler.flush())
+        self.reset()
+        return tail
+
+
+class JitterBuffer:
+    """Playout policy for the assistant voice.
+
+    An item is held back until ``target_s`` of audio is queued or the item has
+    ended. ``target_s`` follows the jitter of delta arrivals (how much later
+    than the previous delta's duration each one arrives) and grows by half on
+    every underrun. Running dry after ``end_item`` is a clean drain, not an
+    underrun.
+    """
+
+    def __init__(self, initial_s: float = JITTER_INITIAL_S, min_s: float = JITTER_MIN_S, max_s: float = JITTER_MAX_S):
+        self.target_s = initial_s
+        self.min_s = min_s
+        self.max_s = max_s
+        self.jitter_s = 0.0
+        self.buffering = True
+        self.active = False
+        self.ended = False
+        self.items = 0
+        self.underruns = 0
+        self.xruns = 0
+        self._prebuffer_total_s = 0.0
+        self._prebuffered_items = 0
+        self._first_arrival: float | None = None
+        self._last_arrival: float | None = None
+        self._last_duration = 0.0
+
+    def begin_item(self) -> None:
+        self.items += 1
+        self.active = True
+        self.ended = False
+        self.buffering = True
+        self._first_arrival = None
+        self._last_arrival = None
+
+    def end_item(self) -> None:
+        self.ended = True
+
+    def reset(self) -> None:
+        """Drop the current item without counting its end as an underrun (barge-in)."""
+        self.active = False
+        self.buffering = True
+
+    def on_data(self, samples: int, now: float) -> None:
+        if not self.active:
+            self.begin_item()
+        if self._last_arrival is None:
+            self._first_arrival = now
+        else:
+            late = max(0.0, now - self._last_arrival - self._last_duration)
+            self.jitter_s += (late - self.jitter_s) / 16
+            goal = min(self.max_s, max(self.min_s, 4 * self.jitter_s))
+            self.target_s += (goal - self.target_s) * 0.05
+        self._last_arrival = now
+        self._last_duration = samples / SAMPLE_RATE
+
+    def ready(self, queued: int, now: float) -> bool:
+        """Whether the assistant voice may play this block, given ``queued`` samples."""
+        if self.buffering and queued and (self.ended or queued >= self.target_s * SAMPLE_RATE):
+            self.buffering = False
+            if self._first_arrival is not None:
+                self._prebuffer_total_s += now - self._first_arrival
+                self._prebuffered_items += 1
+                self._first_arrival = None
+        return not self.buffering
+
+    def after_block(self, played: int, frames: int) -> None:
+        if not self.active or self.buffering or played == frames:
+            return
+        self.buffering = True
+        if self.ended:
+            self.active = False
+        else:
+            self.underruns += 1
+            self.target_s = min(self.max_s, self.target_s * 1.5)
+
+    def stats(self, queued: int) -> dict:
+        return {
+            "items": self.items,
+            "underruns": self.underruns,
+            "xruns": self.xruns,
+            "jitter_ms": self.jitter_s * 1000,
+            "target_ms": self.target_s * 1000,
+            "depth_ms": queued * 1000 / SAMPLE_RATE,
+            "mean_prebuffer_ms": self._prebuffer_total_s * 1000 / max(1, self._prebuffered_items),
+        }
+
+
 class AudioPlayerAsync:
-    def __init__(self):
-        self.queue = []
+    """Output stream mixing several named voices (assistant speech, effects, filler).
+
+    ``add_data`` and ``queue`` refer to the assistant voice, as before; ``play``
+    queues samples on any voice. Mixing happens in the callback with
+    preallocated buffers and saturates to int16. Assistant speech goes through
+    a ``JitterBuffer``; call ``begin_item``/``end_item`` around each audio item.
+    Without ``device`` the output device is asked for on the terminal.
+    """
+
+    def __init__(
+        self,
+        stream_factory: Callable[..., Any] | None = None,
+        voices: list[Voice] | None = None,
+        jitter: JitterBuffer | None = None,
+        audio_format: str = AUDIO_FORMAT_PCM16,
+        device: int | None = None,
+    ):
+        self.voices = {voice.name: voice for voice in (voices or default_voices())}
+        self.assistant = self.voices[VOICE_ASSISTANT]
+        self.queue = self.assistant.queue
+        self.jitter = jitter if jitter is not None else JitterBuffer()
+        self.decoder = WireDecoder(audio_format)
         self.lock = threading.Lock()
-        
-        # Set the output device index for AirPods Max
-        print("Available audio devices:")
-        print(sd.query_devices())
-        output_device_index = int(input("Enter the index of the output device: "))
-        
-        self.stream = sd.OutputStream(
+
+        if stream_factory is None:
+            # sounddevice needs PortAudio, so it is only imported for a real device
+            import sounddevice as sd
+
+            if device is None:
+                # Set the output device index for AirPods Max
+                print("Available audio devices:")
+                print(sd.query_devices())
+                device = int(input("Enter the index of the output device: "))
+            stream_factory = sd.OutputStream
+
+        blocksize = int(CHUNK_LENGTH_S * SAMPLE_RATE)
+        self.stream = stream_factory(
             callback=self.callback,
             samplerate=SAMPLE_RATE,
             channels=CHANNELS,
             dtype=np.int16,
-            blocksize=int(CHUNK_LENGTH_S * SAMPLE_RATE),
-            device=output_device_index  # Use the AirPods Max as the output device
+            blocksize=blocksize,
+            device=device  # Use the AirPods Max as the output device
         )
+        self._alloc_mix_buffers(blocksize)
         self.playing = False
         self._frame_count = 0
+        # set by interrupt(), resolved by the callback once the speaker goes silent
+        self._silence_pending = False
+        self.silenced_at: float | None = None
+        # first audible block since reset_playback_stamp(), for turn latency metrics
+        self.playback_started_at: float | None = None
+
+    def _alloc_mix_buffers(self, frames: int) -> None:
+        self._read_buf = np.zeros(frames, dtype=np.int16)
+        self._samples = np.zeros(frames, dtype=np.float32)
+        self._scaled = np.zeros(frames, dtype=np.float32)
+        self._mix = np.zeros(frames, dtype=np.float32)
+        self._ramp = np.arange(frames, dtype=np.float32) / frames
 
     def callback(self, outdata, frames, time, status):  # noqa
         with self.lock:
-            data = np.empty(0, dtype=np.int16)
+            if status and status.output_underflow:
+                self.jitter.xruns += 1
+            assistant = self.assistant
+            speaking = self.jitter.ready(len(assistant.queue), monotonic())
+            ducking = False
+            mixing = False
+            for voice in self.voices.values():
+                if len(voice.queue):
+                    ducking = ducking or voice.ducks_others
+                    mixing = mixing or voice is not assistant
+
+            if not mixing and assistant.gain == 1.0 and assistant.applied_gain in (None, 1.0):
+                # speech only (the common case): copy straight from the ring buffer, no mixing
+                n = assistant.queue.read_into(outdata[:, 0]) if speaking else 0
+                outdata[n:] = 0
+                for voice in self.voices.values():
+                    # silent voices can jump to their target gain without a click
+                    voice.applied_gain = self._target_gain(voice, ducking)
+            else:
+                n = self._mix_voices(outdata, frames, ducking, speaking)
+            self.jitter.after_block(n, frames)
+
+            self._frame_count += n
+            if n and self.playback_started_at is None:
+                self.playback_started_at = monotonic() + self.stream.latency
+            if self._silence_pending and n < frames:
+                # this block reaches the DAC after the stream's output latency
+                self.silenced_at = monotonic() + self.stream.latency
+                self._silence_pending = False
+
+    def _target_gain(self, voice: Voice, ducking: bool) -> float:
+        ducked = ducking and not voice.ducks_others
+        return voice.gain * (voice.duck_gain if ducked else 1.0)
+
+    def _gain_ramp(self, voice: Voice, n: int, ducking: bool) -> np.ndarray:
+        """Per-sample gain for the next ``n`` samples of ``voice`` in ``_scaled``."""
+        target = self._target_gain(voice, ducking)
+        scaled = self._scaled[:n]
+        if voice.applied_gain is None or target == voice.applied_gain:
+            scaled.fill(target)
+        else:
+            np.multiply(self._ramp[:n], target - voice.applied_gain, out=scaled)
+            scaled += voice.applied_gain
+        voice.applied_gain = target
+        return scaled
+
+    def _mix_voices(self, outdata, frames: int, ducking: bool, speaking: bool) -> int:
+        if len(self._mix) < frames:
+            self._alloc_mix_buffers(frames)
+        mix = self._mix[:frames]
+        mix.fill(0.0)
+        assistant_frames = 0
+        for voice in self.voices.values():
+            if voice is self.assistant:
+                # held back while the jitter buffer fills
+                n = voice.queue.read_into(self._read_buf[:frames]) if speaking else 0
+                assistant_frames = n
+            else:
+                n = voice.queue.read_into(self._read_buf[:frames])
+            scaled = self._gain_ramp(voice, n, ducking)
+            if n:
+                samples = self._samples[:n]
+                np.copyto(samples, self._read_buf[:n])
+                samples *= scaled
+                mix[:n] += samples
+        # saturate instead of wrapping around when voices overlap at full scale
+        np.clip(mix, -32768, 32767, out=mix)
+        np.copyto(outdata[:, 0], mix, casting="unsafe")
+        return assistant_frames
 
-            # get next item from queue if there is still space in the buffer
-            while len(data) < frames and len(self.queue) > 0:
-                item = self.queue.pop(0)
-                frames_needed = frames - len(data)
-                data = np.concatenate((data, item[:frames_needed]))
-                if len(item) > frames_needed:
-                    self.queue.insert(0, item[frames_needed:])
-
-            self._frame_count += len(data)
+    def reset_frame_count(self):
+        self._frame_count = 0
 
-            # fill the rest of the frames with zeros if there is no more data
-            if len(data) < frames:
-                data = np.concatenate((data, np.zeros(frames - len(data), dtype=np.int16)))
+    def begin_item(self):
+        """A new assistant audio item starts: reset the played-frame count and prebuffer it."""
+        with self.lock:
+            self._frame_count = 0
+            self.jitter.begin_item()
+            self.decoder.reset()
 
-        outdata[:] = data.reshape(-1, 1)
+    def end_item(self):
+        """No more deltas for the current item; whatever is queued plays out."""
+        with self.lock:
+            # the resampler holds back a few milliseconds of the item
+            self.assistant.queue.write(self.decoder.flush())
+            self.jitter.end_item()
 
-    def reset_frame_count(self):
-        self._frame_count = 0
+    def stats(self) -> dict:
+        with self.lock:
+            return self.jitter.stats(len(self.queue))
 
     def get_frame_count(self):
         return self._frame_count
 
+    def reset_playback_stamp(self):
+        self.playback_started_at = None
+
     def add_data(self, data: bytes):
+        # bytes is single channel audio in the session's output format, convert to device-rate pcm16
+        np_data = self.decoder.decode(data)
         with self.lock:
-            # bytes is pcm16 single channel audio data, convert to numpy array
-            np_data = np.frombuffer(data, dtype=np.int16)
-            self.queue.append(np_data)
+            self.assistant.write(np_data)
+            self.jitter.on_data(len(np_data), monotonic())
+            if not self.playing:
+                self.start()
+
+    def play(self, samples: np.ndarray, voice: str = VOICE_EFFECTS) -> None:
+        """Queue int16 samples (e.g. from a ``SoundBank``) on ``voice``; no I/O, no thread."""
+        with self.lock:
+            self.voices[voice].write(samples)
             if not self.playing:
                 self.start()
 
     def clear_data(self):
         with self.lock:
-            self.queue = []
+            self.queue.clear()
+            self.jitter.reset()
+
+    def interrupt(self) -> tuple[int, bool]:
+        """Drop queued audio at once for barge-in.
+
+        Returns the frames played for the current item and whether anything was
+        still queued. ``silenced_at`` is set when the speaker actually goes quiet.
+        """
+        with self.lock:
+            had_audio = len(self.queue) > 0
+            for voice in self.voices.values():
+                if voice.interruptible:
+                    voice.queue.clear()
+            self.jitter.reset()
+            self.silenced_at = None
+            self._silence_pending = True
+            return self._frame_count, had_audio
 
     def start(self):
         self.playing = True
@@ -98,7 +532,8 @@ class AudioPlayerAsync:
         self.playing = False
         self.stream.stop()
         with self.lock:
-            self.queue = []
+            for voice in self.voices.values():
+                voice.queue.clear()
 
     def terminate(self):
         self.stream.close()
@@ -110,6 +545,8 @@ async def send_audio_worker_sounddevice(
     should_send: Callable[[], bool] | None = None,
     start_send: Callable[[], Awaitable[None]] | None = None,
 ):
+    import sounddevice as sd
+
     sent_audio = False
 
     device_info = sd.query_devices()
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+import numpy as np
+
+from src.audio_util import AUDIO_FORMAT_PCM16, AUDIO_FORMATS, CHANNELS, SAMPLE_RATE
+from src.g711 import CODECS, G711_RATE
+from src.resample import PolyphaseResampler, to_int16
+
+FRAME_LENGTH_S = 0.02  # 20ms
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_BLOCK = "block"
+
+
+class FrameQueue:
+    """Bounded hand-off from the PortAudio thread to the event loop.
+
+    ``put`` is called on the audio thread, ``get`` is awaited on the loop. When
+    the queue is full, ``drop_oldest`` discards the oldest frame and ``block``
+    waits up to ``block_timeout`` for the sender to catch up before dropping
+    the new frame.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        maxsize: int,
+        overflow: str = OVERFLOW_DROP_OLDEST,
+        block_timeout: float = FRAME_LENGTH_S,
+    ):
+        if overflow not in (OVERFLOW_DROP_OLDEST, OVERFLOW_BLOCK):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.loop = loop
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self.max_depth = 0
+        self._frames: deque[np.ndarray] = deque()
+        self._cond = threading.Condition()
+        self._ready = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def put(self, frame: np.ndarray) -> None:
+        with self._cond:
+            if len(self._frames) >= self.maxsize:
+                if self.overflow == OVERFLOW_BLOCK:
+                    self._cond.wait_for(lambda: len(self._frames) < self.maxsize, self.block_timeout)
+                    if len(self._frames) >= self.maxsize:
+                        self.dropped += 1
+                        return
+                else:
+                    self._frames.popleft()
+                    self.dropped += 1
+            self._frames.append(frame)
+            self.max_depth = max(self.max_depth, len(self._frames))
+        self.loop.call_soon_threadsafe(self._ready.set)
+
+    def get_nowait(self) -> np.ndarray | None:
+        with self._cond:
+            if not self._frames:
+                self._ready.clear()
+                return None
+            frame = self._frames.popleft()
+            self._cond.notify()
+            return frame
+
+    async def get(self) -> np.ndarray:
+        while True:
+            frame = self.get_nowait()
+            if frame is not None:
+                return frame
+            await self._ready.wait()
+
+    async def get_batch(self, min_frames: int = 1) -> list[np.ndarray]:
+        """Wait until ``min_frames`` are queued, then take every queued frame."""
+        while len(self._frames) < min_frames:
+            # cleared before the check, so a put landing in between still wakes us
+            self._ready.clear()
+            if len(self._frames) >= min_frames:
+                break
+            await self._ready.wait()
+        with self._cond:
+            frames = list(self._frames)
+            self._frames.clear()
+            self._cond.notify_all()
+        return frames
+
+
+class MicCapture:
+    """Callback-driven microphone capture feeding a bounded ``FrameQueue``."""
+
+    def __init__(
+        self,
+        device: int | None = None,
+        queue_frames: int = 50,
+        overflow: str = OVERFLOW_DROP_OLDEST,
+        frame_length_s: float = FRAME_LENGTH_S,
+        stream_factory: Callable[..., Any] | None = None,
+    ):
+        self.queue = FrameQueue(asyncio.get_running_loop(), queue_frames, overflow)
+        self.overruns = 0
+        if stream_factory is None:
+            import sounddevice as sd
+
+            stream_factory = sd.InputStream
+        self.stream = stream_factory(
+            channels=CHANNELS,
+            samplerate=SAMPLE_RATE,
+            dtype="int16",
+            blocksize=int(SAMPLE_RATE * frame_length_s),
+            device=device,
+            callback=self.callback,
+        )
+
+    def callback(self, indata, frames, time, status):  # noqa
+        if status.input_overflow:
+            self.overruns += 1
+        # indata is reused by PortAudio after the callback returns
+        self.queue.put(indata[:, 0].copy())
+
+    async def read(self) -> np.ndarray:
+        return await self.queue.get()
+
+    async def read_batch(self, min_frames: int = 1) -> list[np.ndarray]:
+        return await self.queue.get_batch(min_frames)
+
+    def stats(self) -> dict:
+        return {
+            "overruns": self.overruns,
+            "dropped": self.queue.dropped,
+            "queue_depth": len(self.queue),
+            "max_queue_depth": self.queue.max_depth,
+        }
+
+    def start(self):
+        self.stream.start()
+
+    def stop(self):
+        self.stream.stop()
+
+    def close(self):
+        self.stream.close()
+
+
+class WireEncoder:
+    """Device-rate pcm16 capture bytes to the session's ``input_audio_format``.
+
+    G.711 chunks are resampled to 8kHz with a streaming resampler (so chunk
+    boundaries stay seamless) and table-encoded; pcm16 passes through.
+    """
+
+    def __init__(self, audio_format: str = AUDIO_FORMAT_PCM16):
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"Unknown audio format: {audio_format}")
+        self.audio_format = audio_format
+        self._encode = CODECS[audio_format][0] if audio_format in CODECS else None
+        self._resampler = PolyphaseResampler(SAMPLE_RATE, G711_RATE) if self._encode else None
+
+    def encode(self, chunk: bytes) -> bytes:
+        if self._encode is None:
+            return chunk
+        samples = self._resampler.process(np.frombuffer(chunk, dtype=np.int16))
+        return self._encode(to_int16(samples)).tobytes()
+
+
+class AudioBatcher:
+    """Coalesces capture frames into fewer ``input_audio_buffer.append`` payloads.
+
+    Frames are merged until ``max_latency_s`` has passed since the first pending
+    frame or ``max_bytes`` is reached. A silence-to-speech transition flushes at
+    once so server VAD sees the onset without the batching delay.
+    """
+
+    def __init__(self, max_latency_s: float = 0.1, max_bytes: int = 9600):
+        self.max_latency_s = max_latency_s
+        self.max_bytes = max_bytes
+        self.messages = 0
+        self.bytes = 0
+        self._pending: list[bytes] = []
+        self._pending_bytes = 0
+        self._pending_since: float | None = None
+        self._in_speech = False
+        self._started_at = time.monotonic()
+
+    def add(self, frame: np.ndarray, is_speech: bool, now: float | None = None) -> bytes | None:
+        """Queue ``frame`` and return a merged payload when one is due."""
+        now = time.monotonic() if now is None else now
+        if self._pending_since is None:
+            self._pending_since = now
+        self._pending.append(frame.tobytes())
+        self._pending_bytes += frame.nbytes
+
+        onset = is_speech and not self._in_speech
+        self._in_speech = is_speech
+        if (
+            onset
+            or self._pending_bytes >= self.max_bytes
+            or now - self._pending_since >= self.max_latency_s
+        ):
+            return self.flush()
+        return None
+
+    def end_speech(self) -> bytes | None:
+        """Mark the end of a speech run and return whatever is still pending."""
+        self._in_speech = False
+        return self.flush()
+
+    def flush(self) -> bytes | None:
+        if not self._pending:
+            return None
+        payload = b"".join(self._pending)
+        self._pending.clear()
+        self._pending_bytes = 0
+        self._pending_since = None
+        self.messages += 1
+        self.bytes += len(payload)
+        return payload
+
+    def stats(self) -> dict:
+        elapsed = max(time.monotonic() - self._started_at, 1e-9)
+        return {
+            "messages_per_second": self.messages / elapsed,
+            "bytes_per_second": self.bytes / elapsed,
+        }
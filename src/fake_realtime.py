@@ -0,0 +1,198 @@
+"""Local websocket server speaking the subset of the Realtime protocol RealtimeApp uses.
+
+It answers ``session.update``, ``conversation.item.create`` and
+``conversation.item.truncate``, counts uplink audio, and replays an event
+trace once the session is configured. A trace is a list of entries:
+
+    {"at": 0.25, "event": {"type": "response.audio.delta", ...}}
+    {"wait": "response.create"}
+
+``at`` is seconds since the start of the trace or the last ``wait``, divided
+by ``speed`` (``float("inf")`` replays as fast as possible). A ``wait`` entry
+pauses until the client sends that event type, e.g. after tool outputs.
+Point the client at it with ``AsyncOpenAI(websocket_base_url=server.url)``;
+traces are recorded and loaded with ``src.trace``.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import itertools
+import json
+
+import numpy as np
+from websockets.asyncio.server import ServerConnection, serve
+from websockets.exceptions import ConnectionClosed
+
+from src.g711 import CODECS, G711_RATE
+
+
+def synthetic_trace(
+    turns: int = 3,
+    utterance_s: float = 1.5,
+    reply_s: float = 3.0,
+    response_delay_s: float = 0.3,
+    delta_s: float = 0.1,
+    delta_interval_s: float = 0.02,
+    tool_call: tuple[str, dict] | None = None,
+    jitter_s: float = 0.0,
+    audio_format: str = "pcm16",
+    seed: int = 0,
+) -> list[dict]:
+    """Turns of user speech followed by a spoken reply, optionally preceded by one tool call.
+
+    Replies stream ``delta_s`` of audio every ``delta_interval_s``, i.e. faster
+    than real time like the real server does. ``jitter_s`` delays each delta by
+    an exponentially distributed extra amount with that mean, like a Wi-Fi link;
+    later deltas queue behind a delayed one, as on a TCP connection.
+    Audio is encoded in ``audio_format`` (pcm16 at 24kHz or G.711 at 8kHz).
+    """
+    rng = np.random.default_rng(seed)
+    sample_rate = G711_RATE if audio_format in CODECS else 24000
+    t = np.arange(int(delta_s * sample_rate)) / sample_rate
+    tone = (3000 * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+    encoded = CODECS[audio_format][0](tone) if audio_format in CODECS else tone
+    delta = base64.b64encode(encoded.tobytes()).decode("utf-8")
+    trace: list[dict] = []
+    at = 0.0
+
+    def add(offset: float, event: dict) -> None:
+        trace.append({"at": round(offset, 4), "event": event})
+
+    for turn in range(turns):
+        add(at, {"type": "input_audio_buffer.speech_started", "audio_start_ms": 0, "item_id": f"item_user_{turn}"})
+        at += utterance_s
+        add(at, {"type": "input_audio_buffer.speech_stopped", "audio_end_ms": 0, "item_id": f"item_user_{turn}"})
+        at += response_delay_s
+
+        if tool_call is not None:
+            name, arguments = tool_call
+            response_id = f"resp_{turn}_tool"
+            add(at, {"type": "response.created", "response": {"id": response_id, "object": "realtime.response"}})
+            add(at, {
+                "type": "response.output_item.done",
+                "response_id": response_id,
+                "output_index": 0,
+                "item": {
+                    "id": f"item_{turn}_call",
+                    "type": "function_call",
+                    "call_id": f"call_{turn}",
+                    "name": name,
+                    "arguments": json.dumps(arguments),
+                },
+            })
+            add(at, {"type": "response.done", "response": {"id": response_id, "object": "realtime.response"}})
+            trace.append({"wait": "response.create"})
+            at = response_delay_s
+
+        response_id = f"resp_{turn}"
+        item_id = f"item_{turn}_reply"
+        add(at, {"type": "response.created", "response": {"id": response_id, "object": "realtime.response"}})
+        arrival = at
+        for i in range(int(round(reply_s / delta_s))):
+            common = {"response_id": response_id, "item_id": item_id, "output_index": 0, "content_index": 0}
+            arrival = max(arrival, at + (rng.exponential(jitter_s) if jitter_s else 0.0))
+            add(arrival, {"type": "response.audio.delta", "delta": delta, **common})
+            add(arrival, {"type": "response.audio_transcript.delta", "delta": "あ", **common})
+            at += delta_interval_s
+        at = arrival
+        add(at, {"type": "response.audio.done", "response_id": response_id, "item_id": item_id,
+                 "output_index": 0, "content_index": 0})
+        add(at, {
+            "type": "response.output_item.done",
+            "response_id": response_id,
+            "output_index": 0,
+            "item": {"id": item_id, "type": "message", "role": "assistant", "content": []},
+        })
+        add(at, {"type": "response.done", "response": {"id": response_id, "object": "realtime.response"}})
+        # the user answers once the reply has been heard
+        at += reply_s
+    return trace
+
+
+class FakeRealtimeServer:
+    def __init__(self, trace: list[dict], speed: float = 1.0, host: str = "127.0.0.1", port: int = 0):
+        self.trace = trace
+        self.speed = speed
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.events_sent = 0
+        self.events_received = 0
+        self.audio_bytes_received = 0
+        self.audio_bytes_sent = 0
+        self.received_types: dict[str, int] = {}
+        self._server = None
+        self._ids = itertools.count()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/v1"
+
+    async def start(self) -> None:
+        self._server = await serve(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _send(self, ws: ServerConnection, event: dict) -> None:
+        await ws.send(json.dumps({"event_id": f"event_{next(self._ids)}", **event}))
+        self.events_sent += 1
+        if event["type"] == "response.audio.delta":
+            self.audio_bytes_sent += len(event["delta"]) * 3 // 4
+
+    async def _handle(self, ws: ServerConnection) -> None:
+        self.connections += 1
+        session = {"id": f"sess_{self.connections}", "object": "realtime.session", "model": "fake-realtime"}
+        waiters: dict[str, asyncio.Event] = {}
+        replay: asyncio.Task | None = None
+        await self._send(ws, {"type": "session.created", "session": session})
+        try:
+            async for message in ws:
+                event = json.loads(message)
+                kind = event.get("type", "")
+                self.events_received += 1
+                self.received_types[kind] = self.received_types.get(kind, 0) + 1
+
+                if kind == "session.update":
+                    session.update(event.get("session", {}))
+                    await self._send(ws, {"type": "session.updated", "session": session})
+                    if replay is None:
+                        replay = asyncio.create_task(self._replay(ws, waiters))
+                elif kind == "input_audio_buffer.append":
+                    self.audio_bytes_received += len(event.get("audio", "")) * 3 // 4
+                elif kind == "conversation.item.create":
+                    await self._send(ws, {"type": "conversation.item.created", "item": event.get("item", {})})
+                elif kind == "conversation.item.truncate":
+                    await self._send(ws, {
+                        "type": "conversation.item.truncated",
+                        "item_id": event.get("item_id"),
+                        "content_index": event.get("content_index", 0),
+                        "audio_end_ms": event.get("audio_end_ms", 0),
+                    })
+                waiters.setdefault(kind, asyncio.Event()).set()
+        except ConnectionClosed:
+            pass
+        finally:
+            if replay is not None:
+                replay.cancel()
+
+    async def _replay(self, ws: ServerConnection, waiters: dict[str, asyncio.Event]) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for entry in self.trace:
+            if "wait" in entry:
+                waiter = waiters.setdefault(entry["wait"], asyncio.Event())
+                await waiter.wait()
+                waiter.clear()
+                start = loop.time()
+                continue
+            delay = start + entry["at"] / self.speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._send(ws, entry["event"])
+        # the trace is over; ending the session lets the client's event loop return
+        await ws.close()
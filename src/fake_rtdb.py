@@ -0,0 +1,127 @@
+"""In-memory stand-in for ``firebase_admin.db`` references.
+
+Implements the subset used here (``child``, ``get``, ``set``, ``listen`` and
+``transaction``) so caches built on the Realtime Database can run offline.
+``latency_s`` simulates the network round trip of the blocking calls.
+"""
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+@dataclass
+class Event:
+    event_type: str
+    path: str
+    data: Any
+
+
+class ListenerRegistration:
+    def __init__(self, database: FakeDatabase, path: tuple[str, ...], callback: Callable[[Event], None]):
+        self._database = database
+        self.path = path
+        self.callback = callback
+
+    def close(self) -> None:
+        self._database.remove_listener(self)
+
+
+class FakeDatabase:
+    def __init__(self, data: dict | None = None, latency_s: float = 0.0):
+        self.data = data if data is not None else {}
+        self.latency_s = latency_s
+        self.lock = threading.RLock()
+        self._listeners: list[ListenerRegistration] = []
+
+    def reference(self, path: str = "/") -> FakeReference:
+        return FakeReference(self, _split(path))
+
+    def _wait(self) -> None:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+    def read(self, path: tuple[str, ...]) -> Any:
+        with self.lock:
+            node: Any = self.data
+            for key in path:
+                if not isinstance(node, dict) or key not in node:
+                    return None
+                node = node[key]
+            return copy.deepcopy(node)
+
+    def write(self, path: tuple[str, ...], value: Any) -> None:
+        with self.lock:
+            if not path:
+                self.data = copy.deepcopy(value) if value is not None else {}
+            else:
+                node = self.data
+                for key in path[:-1]:
+                    node = node.setdefault(key, {})
+                if value is None:
+                    node.pop(path[-1], None)
+                else:
+                    node[path[-1]] = copy.deepcopy(value)
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            depth = len(listener.path)
+            if path[:depth] == listener.path:
+                # write at or below the listened path
+                relative = "/" + "/".join(path[depth:])
+                listener.callback(Event("put", relative, copy.deepcopy(value)))
+            elif listener.path[: len(path)] == path:
+                # write above the listened path replaces it
+                listener.callback(Event("put", "/", self.read(listener.path)))
+
+    def add_listener(self, listener: ListenerRegistration) -> None:
+        with self.lock:
+            self._listeners.append(listener)
+            initial = self.read(listener.path)
+        listener.callback(Event("put", "/", initial))
+
+    def remove_listener(self, listener: ListenerRegistration) -> None:
+        with self.lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+
+class FakeReference:
+    def __init__(self, database: FakeDatabase, path: tuple[str, ...]):
+        self._database = database
+        self.path = path
+
+    @property
+    def key(self) -> str | None:
+        return self.path[-1] if self.path else None
+
+    def child(self, path: str) -> FakeReference:
+        return FakeReference(self._database, self.path + _split(path))
+
+    def get(self) -> Any:
+        self._database._wait()
+        return self._database.read(self.path)
+
+    def set(self, value: Any) -> None:
+        self._database._wait()
+        self._database.write(self.path, value)
+
+    def listen(self, callback: Callable[[Event], None]) -> ListenerRegistration:
+        listener = ListenerRegistration(self._database, self.path, callback)
+        self._database.add_listener(listener)
+        return listener
+
+    def transaction(self, transaction_update: Callable[[Any], Any]) -> Any:
+        self._database._wait()
+        with self._database.lock:
+            # exceptions raised by transaction_update abort the transaction, as in firebase_admin
+            value = transaction_update(self._database.read(self.path))
+            self._database.write(self.path, value)
+        return value
+
+
+def _split(path: str) -> tuple[str, ...]:
+    return tuple(part for part in path.split("/") if part)
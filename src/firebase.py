@@ -1,7 +1,25 @@
+import threading
+
 from firebase_admin import credentials, initialize_app, db, firestore
 
+from src.presence import PresenceSet, ProfileCache
+from src.whiteboard import (
+    WhiteboardCache,
+    WhiteboardConflict,
+    apply_operations,
+    is_safe_edit,
+    parse_board,
+    render_board,
+)
+
 DB = None
 RTDB = None
+WHITEBOARD = None
+PRESENCE = None
+PROFILES = None
+CREDENTIALS_PATH = "credentials/aigrid/sa.json"
+# tools run on worker threads, so lazy initialization must not race
+_init_lock = threading.RLock()
 
 
 def initialize_firebase(cred_path: str) -> None:
@@ -21,33 +39,88 @@ def initialize_firebase(cred_path: str) -> None:
         raise RuntimeError("Realtime database client is nil after initialization")
 
 
-initialize_firebase("credentials/aigrid/sa.json")
+def _rtdb():
+    # initialized on first use so importing this module never touches the network
+    with _init_lock:
+        if RTDB is None:
+            initialize_firebase(CREDENTIALS_PATH)
+    return RTDB
+
+
+def _db():
+    with _init_lock:
+        if DB is None:
+            initialize_firebase(CREDENTIALS_PATH)
+    return DB
+
+
+def _whiteboard():
+    global WHITEBOARD
+    with _init_lock:
+        if WHITEBOARD is None:
+            WHITEBOARD = WhiteboardCache(_rtdb().child("whiteboard").child("content"))
+            WHITEBOARD.start()
+    return WHITEBOARD
 
 
 def get_whiteboard_data() -> str:
-    whiteboard_data = RTDB.child("whiteboard").child("content").get()
-    return whiteboard_data
+    return _whiteboard().get()
 
 
-def update_whiteboard_data(content: str, old_content: str) -> None:
-    # diff old_content and content, then if more than 50 % of the content is different, error
-    if abs(len(content) - len(old_content)) > len(old_content) * 0.5:
+def get_whiteboard_snapshot() -> tuple[str, int]:
+    return _whiteboard().snapshot()
+
+
+def update_whiteboard_data(content: str, old_content: str, version: int) -> None:
+    # diff old_content and content line by line, then if more than 50 % of the lines changed, error
+    if not is_safe_edit(parse_board(old_content), parse_board(content)):
         return "ホワイトボードのデータを編集できませんでした。(理由：内容が大きく変わっています)"
-    else:
-        RTDB.child("whiteboard").child("content").set(content)
+    try:
+        _whiteboard().compare_and_set(content, version)
+    except WhiteboardConflict:
+        return "ホワイトボードのデータを編集できませんでした。(理由：他の編集と競合しました)"
+    return "ホワイトボードのデータを編集しました。"
+
+
+def patch_whiteboard_data(operations: list[dict], retries: int = 1) -> str:
+    for _ in range(retries + 1):
+        old_content, version = get_whiteboard_snapshot()
+        old_items = parse_board(old_content)
+        try:
+            new_items = apply_operations(old_items, operations)
+        except (ValueError, KeyError) as e:
+            return f"ホワイトボードのデータを編集できませんでした。(理由：{e})"
+        if not is_safe_edit(old_items, new_items, allow_single_line=True):
+            return "ホワイトボードのデータを編集できませんでした。(理由：内容が大きく変わっています)"
+        try:
+            _whiteboard().compare_and_set(render_board(new_items), version)
+        except WhiteboardConflict:
+            # operations are relative to item text, so they can be reapplied on the fresh board
+            continue
         return "ホワイトボードのデータを編集しました。"
+    return "ホワイトボードのデータを編集できませんでした。(理由：他の編集と競合しました)"
+
+
+def _presence():
+    global PRESENCE
+    with _init_lock:
+        if PRESENCE is None:
+            PRESENCE = PresenceSet(_rtdb().child("inoutList"))
+            PRESENCE.start()
+    return PRESENCE
 
 
-def _get_user_info(uid: str) -> dict:
-    return DB.collection("users").document(uid).get().to_dict()
+def _profiles():
+    global PROFILES
+    with _init_lock:
+        if PROFILES is None:
+            client = _db()
+            PROFILES = ProfileCache(client, client.collection("users"))
+            PROFILES.start()
+    return PROFILES
 
 
 def get_current_users() -> list[str]:
-    uids_dict = RTDB.child("inoutList").get()
-    uids = [uid for uid, value in uids_dict.items() if value is True]
-    usernames = []
-    for uid in uids:
-        user_info = _get_user_info(uid)
-        print(user_info)
-        usernames.append(user_info["username"])
-    return usernames
+    uids = _presence().uids()
+    profiles = _profiles().get_many(uids)
+    return [profiles[uid]["username"] for uid in uids if uid in profiles]
@@ -1,34 +1,83 @@
-from src.tools import (
-    check_heater_health_tool,
-    control_heater_tool,
-    get_whiteboard_data_tool,
-    edit_whiteboard_data_tool,
-    get_current_users_tool,
-)
+import asyncio
+import importlib
+import inspect
+import json
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
 
+# seconds a tool may run before the executor gives up on it
+DEFAULT_TOOL_TIMEOUT_S = 10
+
+# "callable" is a "module:attribute" path, imported on the first call of the tool
+# so that e.g. Firebase is only initialized once a Firebase tool is actually used.
+# "cache_ttl" caches results per arguments for that many seconds; "invalidates"
+# lists the cached tools whose results a call of this tool makes stale.
 tools = [
     {
         "type": "function",
         "name": "check_heater_health",
         "description": "灯油ストーブサーバーのヘルスチェックを行います。",
-        "callable": check_heater_health_tool,
+        "callable": "src.tools:check_heater_health_tool",
+        "timeout": 6,
+        "cache_ttl": 5,
     },
     {
-        "type": "function", 
+        "type": "function",
         "name": "control_heater",
         "description": "灯油ストーブの電源を操作します。",
-        "callable": control_heater_tool,
+        "callable": "src.tools:control_heater_tool",
+        "timeout": 6,
+        "invalidates": ["check_heater_health"],
     },
     {
         "type": "function",
-        "name": "get_whiteboard_data", 
+        "name": "get_whiteboard_data",
         "description": "ホワイトボードのデータを取得します。ホワイトボードには生活のTODOや、食材、その他のメモを記録しています。",
-        "callable": get_whiteboard_data_tool,
+        "callable": "src.tools:get_whiteboard_data_tool",
+        "cache_ttl": 10,
+    },
+    {
+        "type": "function",
+        "name": "patch_whiteboard_data",
+        "description": "ホワイトボードの行を追加・削除・更新します。ホワイトボードの編集には基本的にこれを使います。",
+        "parameters": {
+            "type": "object",
+            "required": ["operations"],
+            "properties": {
+                "operations": {
+                    "type": "array",
+                    "description": "順番に適用する編集操作のリスト。",
+                    "items": {
+                        "type": "object",
+                        "required": ["op"],
+                        "properties": {
+                            "op": {
+                                "type": "string",
+                                "enum": ["add", "remove", "update"],
+                                "description": "add: 行を末尾に追加、remove: 行を削除、update: 行を書き換え。",
+                            },
+                            "target": {
+                                "type": "string",
+                                "description": "remove/updateの対象となる既存の行、またはその一部。例えば'納豆'。",
+                            },
+                            "text": {
+                                "type": "string",
+                                "description": "add/updateで書き込む行の内容。例えば'・納豆を買う'。",
+                            },
+                        },
+                    },
+                },
+            },
+        },
+        "callable": "src.tools:patch_whiteboard_data_tool",
+        "invalidates": ["get_whiteboard_data"],
     },
     {
         "type": "function",
         "name": "edit_whiteboard_data",
-        "description": "ホワイトボードのデータを部分的に編集します。",
+        "description": "ホワイトボードのデータを部分的に編集します。patch_whiteboard_dataで表現できない大きな編集のときだけ使います。",
         "parameters": {
             "type": "object",
             "required": ["content"],
@@ -39,32 +88,254 @@ tools = [
                 },
             },
         },
-        "callable": edit_whiteboard_data_tool,
+        "callable": "src.tools:edit_whiteboard_data_tool",
+        "timeout": 30,
+        "invalidates": ["get_whiteboard_data"],
     },
     {
         "type": "function",
         "name": "get_current_users",
         "description": "現在のユーザーを取得します。",
-        "callable": get_current_users_tool,
+        "callable": "src.tools:get_current_users_tool",
+        "cache_ttl": 10,
     },
 ]
 
+_JSON_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+}
+
+
+def _compile_validator(parameters):
+    properties = (parameters or {}).get("properties", {})
+    required = tuple((parameters or {}).get("required", ()))
+    types = {
+        name: _JSON_TYPES[prop["type"]]
+        for name, prop in properties.items()
+        if prop.get("type") in _JSON_TYPES
+    }
+
+    def validate(function_args: dict) -> None:
+        missing = [name for name in required if name not in function_args]
+        if missing:
+            raise ValueError(f"Missing required arguments: {missing}")
+        unknown = [name for name in function_args if name not in properties]
+        if unknown:
+            raise ValueError(f"Unknown arguments: {unknown}")
+        for name, value in function_args.items():
+            expected = types.get(name)
+            if expected is not None and not isinstance(value, expected):
+                raise ValueError(f"Argument {name} must be of type {properties[name]['type']}")
 
+    return validate
+
+
+_tools_by_name = {tool["name"]: tool for tool in tools}
+_validators = {tool["name"]: _compile_validator(tool.get("parameters")) for tool in tools}
+_callables = {}
+
+
+@lru_cache(maxsize=None)
 def get_tools():
     # return tool but without callable and include parameters if present
     return [{
         "type": tool["type"],
-        "name": tool["name"], 
+        "name": tool["name"],
         "description": tool["description"],
         "parameters": tool.get("parameters")
     } for tool in tools]
 
+
+@lru_cache(maxsize=None)
+def get_chat_tools():
+    # same tools in the chat completions format
+    return [{
+        "type": tool["type"],
+        "function": {
+            "name": tool["name"],
+            "description": tool["description"],
+            "parameters": tool.get("parameters") or {"type": "object", "properties": {}},
+        },
+    } for tool in tools]
+
+
+def get_tool(function_name):
+    try:
+        return _tools_by_name[function_name]
+    except KeyError:
+        raise ValueError(f"Function {function_name} not found in tools") from None
+
+
+def is_loaded(function_name):
+    return function_name in _callables
+
+
+def resolve_tool(function_name, function_args):
+    """Validate the arguments and return the tool's callable, importing it on first use."""
+    tool = get_tool(function_name)
+    _validators[function_name](function_args)
+    try:
+        return _callables[function_name]
+    except KeyError:
+        module_name, attr = tool["callable"].split(":")
+        fn = getattr(importlib.import_module(module_name), attr)
+        _callables[function_name] = fn
+        return fn
+
+
+class ToolFailure(str):
+    """A tool result reporting a failure.
+
+    Tools answer the model with a message rather than raising, so failures
+    are still strings; the type lets the cache and the context prefetch tell
+    them apart without parsing the text.
+    """
+
+
+# untyped failure messages used throughout the repo
+_ERROR_PREFIXES = ("エラーが発生しました", "タイムアウトしました")
+
+
+def is_tool_failure(result):
+    return isinstance(result, ToolFailure) or (isinstance(result, str) and result.startswith(_ERROR_PREFIXES))
+
+
+class ToolCache:
+    """Caches tool results per arguments for the tool's ``cache_ttl``.
+
+    Concurrent identical calls share one execution (single-flight), from
+    threads via ``call`` and from coroutines via ``call_async``. Calling a tool
+    with ``invalidates`` drops those tools' entries once it finishes, and a
+    read that was in flight meanwhile does not store its possibly stale result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # (name, args json) -> (expires, result)
+        self._generations = {}  # name -> number of invalidations
+        self._futures = {}  # in-flight sync calls
+        self._tasks = {}  # in-flight async calls
+        self._counters = {}
+
+    def _count(self, function_name, counter):
+        counters = self._counters.setdefault(
+            function_name, {"hits": 0, "misses": 0, "coalesced": 0, "invalidations": 0}
+        )
+        counters[counter] += 1
+
+    def _lookup(self, key, in_flight_maps):
+        """Under the lock: ``(hit, result, in_flight)``, counting the outcome."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._count(key[0], "hits")
+            return True, entry[1], None
+        in_flight = next((calls[key] for calls in in_flight_maps if key in calls), None)
+        self._count(key[0], "misses" if in_flight is None else "coalesced")
+        return False, None, in_flight
+
+    def _store(self, key, generation, ttl, result):
+        if is_tool_failure(result):
+            return
+        with self._lock:
+            if self._generations.get(key[0], 0) == generation:
+                self._entries[key] = (time.monotonic() + ttl, result)
+
+    def invalidate(self, *function_names):
+        with self._lock:
+            for function_name in function_names:
+                self._generations[function_name] = self._generations.get(function_name, 0) + 1
+                self._count(function_name, "invalidations")
+            for key in [key for key in self._entries if key[0] in function_names]:
+                del self._entries[key]
+
+    def call(self, function_name, function_args, fn):
+        """Run ``fn(**function_args)`` through the cache from a thread."""
+        tool = get_tool(function_name)
+        ttl = tool.get("cache_ttl")
+        if not ttl:
+            try:
+                return fn(**function_args)
+            finally:
+                self.invalidate(*tool.get("invalidates", ()))
+
+        key = (function_name, json.dumps(function_args, sort_keys=True, ensure_ascii=False))
+        with self._lock:
+            # a thread cannot wait for an async call, so only sync calls are shared here
+            hit, result, in_flight = self._lookup(key, (self._futures,))
+            if hit:
+                return result
+            if in_flight is None:
+                future = self._futures[key] = Future()
+                generation = self._generations.get(function_name, 0)
+        if in_flight is not None:
+            return in_flight.result()
+
+        try:
+            result = fn(**function_args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self._store(key, generation, ttl, result)
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._futures.pop(key, None)
+
+    async def call_async(self, function_name, function_args, call):
+        """Await ``call()`` through the cache. Cancelling one caller does not cancel the shared call."""
+        tool = get_tool(function_name)
+        ttl = tool.get("cache_ttl")
+        if not ttl:
+            try:
+                return await call()
+            finally:
+                self.invalidate(*tool.get("invalidates", ()))
+
+        key = (function_name, json.dumps(function_args, sort_keys=True, ensure_ascii=False))
+        with self._lock:
+            hit, result, in_flight = self._lookup(key, (self._tasks, self._futures))
+            if hit:
+                return result
+            if in_flight is None:
+                in_flight = asyncio.ensure_future(self._lead(key, self._generations.get(function_name, 0), ttl, call))
+                # retrieve the exception even if every caller was cancelled
+                in_flight.add_done_callback(lambda task: task.cancelled() or task.exception())
+                self._tasks[key] = in_flight
+        if isinstance(in_flight, Future):
+            return await asyncio.wrap_future(in_flight)
+        return await asyncio.shield(in_flight)
+
+    async def _lead(self, key, generation, ttl, call):
+        try:
+            result = await call()
+            self._store(key, generation, ttl, result)
+            return result
+        finally:
+            with self._lock:
+                self._tasks.pop(key, None)
+
+    def stats(self):
+        """Hits, misses, coalesced calls and invalidations per tool."""
+        with self._lock:
+            return {name: dict(counters) for name, counters in self._counters.items()}
+
+
+TOOL_CACHE = ToolCache()
+
+
 def exec_tool(function_name, function_args):
-    tool = next(
-        (tool for tool in tools if tool["name"] == function_name), None
-    )
+    """Run a sync tool (``Agent``). Coroutine tools need an event loop; use ``ToolExecutor``."""
+    fn = resolve_tool(function_name, function_args)
+    if inspect.iscoroutinefunction(fn):
+        # a throwaway loop per call would strand the shared AsyncOpenAI client and the
+        # heater refresher on a closed loop, and caching the bare coroutine is worse
+        raise TypeError(f"{function_name} is a coroutine tool; run it through ToolExecutor")
     print(f"calling {function_name} with {function_args}...")
-    if tool:
-        return tool["callable"](**function_args)
-    else:
-        raise ValueError(f"Function {function_name} not found in tools")
+    return TOOL_CACHE.call(function_name, function_args, fn)
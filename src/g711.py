@@ -0,0 +1,82 @@
+"""Table-driven G.711 μ-law / A-law codecs (the Realtime API's ``g711_ulaw``/``g711_alaw``).
+
+Encoding indexes a 64K-entry table with the int16 samples reinterpreted as
+uint16, decoding a 256-entry table with the code bytes, so both are a single
+NumPy gather. The tables follow the reference segment logic (Sun g711.c).
+"""
+from __future__ import annotations
+
+import numpy as np
+
+# G.711 always runs at 8 kHz
+G711_RATE = 8000
+
+_ALL_PCM = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32)
+_ULAW_SEGMENT_ENDS = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+_ALAW_SEGMENT_ENDS = np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF])
+
+
+def _build_ulaw_encode() -> np.ndarray:
+    pcm = _ALL_PCM >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(pcm), 8159) + (0x84 >> 2)
+    segment = np.searchsorted(_ULAW_SEGMENT_ENDS, magnitude)
+    code = (np.minimum(segment, 7) << 4) | ((magnitude >> (np.minimum(segment, 7) + 1)) & 0x0F)
+    code = np.where(segment >= 8, 0x7F, code)
+    return (code ^ mask).astype(np.uint8)
+
+
+def _build_alaw_encode() -> np.ndarray:
+    pcm = _ALL_PCM >> 3
+    negative = pcm < 0
+    mask = np.where(negative, 0x55, 0xD5)
+    magnitude = np.where(negative, -pcm - 1, pcm)
+    segment = np.searchsorted(_ALAW_SEGMENT_ENDS, magnitude)
+    shift = np.where(segment < 2, 1, np.minimum(segment, 7))
+    code = (np.minimum(segment, 7) << 4) | ((magnitude >> shift) & 0x0F)
+    code = np.where(segment >= 8, 0x7F, code)
+    return (code ^ mask).astype(np.uint8)
+
+
+def _build_ulaw_decode() -> np.ndarray:
+    code = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (code >> 4) & 0x07
+    magnitude = ((((code & 0x0F) << 3) + 0x84) << exponent) - 0x84
+    return np.where(code & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+def _build_alaw_decode() -> np.ndarray:
+    code = np.arange(256, dtype=np.int32) ^ 0x55
+    exponent = (code >> 4) & 0x07
+    mantissa = (code & 0x0F) << 4
+    magnitude = np.where(exponent == 0, mantissa + 8, (mantissa + 0x108) << np.maximum(exponent - 1, 0))
+    return np.where(code & 0x80, magnitude, -magnitude).astype(np.int16)
+
+
+_ULAW_ENCODE = _build_ulaw_encode()
+_ALAW_ENCODE = _build_alaw_encode()
+_ULAW_DECODE = _build_ulaw_decode()
+_ALAW_DECODE = _build_alaw_decode()
+
+
+def ulaw_encode(pcm: np.ndarray) -> np.ndarray:
+    return _ULAW_ENCODE[pcm.astype(np.int16, copy=False).view(np.uint16)]
+
+
+def ulaw_decode(data: bytes | np.ndarray) -> np.ndarray:
+    return _ULAW_DECODE[np.frombuffer(data, dtype=np.uint8)]
+
+
+def alaw_encode(pcm: np.ndarray) -> np.ndarray:
+    return _ALAW_ENCODE[pcm.astype(np.int16, copy=False).view(np.uint16)]
+
+
+def alaw_decode(data: bytes | np.ndarray) -> np.ndarray:
+    return _ALAW_DECODE[np.frombuffer(data, dtype=np.uint8)]
+
+
+# Realtime API audio format name -> (encode, decode)
+CODECS = {
+    "g711_ulaw": (ulaw_encode, ulaw_decode),
+    "g711_alaw": (alaw_encode, alaw_decode),
+}
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.function_dict import ToolFailure
+
+HEATER_URL = "http://192.168.2.127:28001"
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class HeaterClient:
+    """Async client for the kerosene heater server.
+
+    Requests go through one keep-alive ``requests.Session`` on worker threads.
+    Health is cached for ``health_ttl_s`` and refreshed in the background, and
+    after ``failure_threshold`` consecutive failures the circuit opens so calls
+    fail immediately until ``reset_timeout_s`` has passed.
+    """
+
+    def __init__(
+        self,
+        base_url: str = HEATER_URL,
+        timeout_s: float = 2.0,
+        health_ttl_s: float = 15.0,
+        failure_threshold: int = 2,
+        reset_timeout_s: float = 30.0,
+        pool_size: int = 2,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout_s = timeout_s
+        self.health_ttl_s = health_ttl_s
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.failures = 0
+        self._open_until = 0.0
+        self._health: str | None = None
+        self._health_at = 0.0
+        self._health_lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    @property
+    def circuit_open(self) -> bool:
+        return time.monotonic() < self._open_until
+
+    async def _get(self, path: str) -> requests.Response:
+        if self.circuit_open:
+            # no countdown, so repeated checks while the heater is down give the same text
+            raise CircuitOpen("heater is unreachable, will retry shortly")
+        try:
+            response = await asyncio.to_thread(self.session.get, self.base_url + path, timeout=self.timeout_s)
+        except requests.RequestException:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self._open_until = time.monotonic() + self.reset_timeout_s
+            raise
+        self.failures = 0
+        self._open_until = 0.0
+        return response
+
+    async def _check_health(self) -> str:
+        try:
+            response = await self._get("/health")
+            if response.status_code != 200:
+                return ToolFailure(f"Unexpected status code: {response.status_code}")
+            return "heater is healthy"
+        except CircuitOpen as e:
+            return ToolFailure(str(e))
+        except requests.RequestException as e:
+            return ToolFailure(f"Error making HTTP request: {e}")
+
+    async def refresh_health(self) -> str:
+        async with self._health_lock:
+            self._health = await self._check_health()
+            self._health_at = time.monotonic()
+            return self._health
+
+    async def health(self) -> str:
+        self._ensure_refresher()
+        if self._health is not None and time.monotonic() - self._health_at < self.health_ttl_s:
+            return self._health
+        return await self.refresh_health()
+
+    async def trigger(self) -> str:
+        try:
+            response = await self._get("/")
+        except CircuitOpen as e:
+            return ToolFailure(str(e))
+        except requests.RequestException as e:
+            return ToolFailure(f"Error making HTTP request: {e}")
+        # the heater state just changed, the cached health is no longer meaningful
+        self._health = None
+        if response.status_code != 200:
+            return ToolFailure(f"Unexpected status code: {response.status_code}")
+        return "heater is triggered"
+
+    def _ensure_refresher(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_ttl_s / 2)
+            await self.refresh_health()
+
+    async def close(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        self.session.close()
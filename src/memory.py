@@ -0,0 +1,214 @@
+"""Token-budgeted chat history for ``Agent``/``AsyncAgent``, optionally persisted in SQLite.
+
+The prompt is the system message (plus a rolling summary of evicted turns)
+followed by the most recent turns. A turn starts with a user message and
+includes the assistant's tool calls and their results, so eviction never
+separates a call from its result.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from typing import Callable
+
+# estimated prompt tokens for the conversation (system + summary + turns)
+DEFAULT_MAX_TOKENS = 4000
+# evict down to this share of the budget, so the prompt prefix stays the same
+# (and cacheable server side) for several turns instead of shifting every turn
+LOW_WATERMARK = 0.75
+SUMMARY_MAX_TOKENS = 400
+# characters kept per evicted message in the extractive summary
+SUMMARY_LINE_CHARS = 60
+# role/separator tokens the chat format adds per message
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_HEADER = "\n\nこれまでの会話の要約:\n"
+
+
+def estimate_tokens(text: str | None) -> int:
+    """Tokenizer-free estimate: ~4 ASCII characters or ~1 kana/kanji per token.
+
+    The UTF-8 length gives the number of multi-byte characters without a
+    Python-level loop (each kana/kanji adds two bytes), so this is O(1) in
+    interpreted code. It errs high for Japanese, which keeps the budget safe.
+    """
+    if not text:
+        return 0
+    chars = len(text)
+    wide = (len(text.encode("utf-8")) - chars) // 2
+    return (chars - wide + 3) // 4 + wide
+
+
+def message_tokens(message: dict) -> int:
+    tokens = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get("content"))
+    for call in message.get("tool_calls") or []:
+        tokens += estimate_tokens(call["function"]["name"]) + estimate_tokens(call["function"]["arguments"])
+    return tokens
+
+
+def extractive_summary(summary: str, messages: list[dict]) -> str:
+    """Default summarizer: one shortened line per user/assistant message, no LLM call."""
+    lines = summary.splitlines() if summary else []
+    for message in messages:
+        if message["role"] == "tool":
+            continue
+        text = (message.get("content") or "").replace("\n", " ")
+        if message.get("tool_calls"):
+            text += " [" + ", ".join(call["function"]["name"] for call in message["tool_calls"]) + "]"
+        if text.strip():
+            lines.append(f"{message['role']}: {text[:SUMMARY_LINE_CHARS]}")
+    return "\n".join(lines)
+
+
+def _trim_summary(summary: str, max_tokens: int) -> str:
+    # the oldest lines go first
+    lines = summary.splitlines()
+    while lines and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class SQLiteMemoryStore:
+    """Keeps every message plus each session's summary and first kept message.
+
+    ``load`` returns only what the prompt still uses, so resuming a long
+    session does not replay its whole history.
+    """
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                message TEXT NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            );
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                first_seq INTEGER NOT NULL
+            );
+            """
+        )
+
+    def append(self, session_id: str, seq: int, message: dict) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?)",
+            (session_id, seq, json.dumps(message, ensure_ascii=False), time.time()),
+        )
+        self._db.commit()
+
+    def save_summary(self, session_id: str, summary: str, first_seq: int) -> None:
+        self._db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", (session_id, summary, first_seq))
+        self._db.commit()
+
+    def load(self, session_id: str) -> tuple[str, int, list[dict]]:
+        """Return ``(summary, first_seq, messages from first_seq on)``."""
+        row = self._db.execute("SELECT summary, first_seq FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        summary, first_seq = row if row is not None else ("", 0)
+        rows = self._db.execute(
+            "SELECT message FROM messages WHERE session_id = ? AND seq >= ? ORDER BY seq", (session_id, first_seq)
+        ).fetchall()
+        return summary, first_seq, [json.loads(message) for (message,) in rows]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class ConversationMemory:
+    """Chat history kept under ``max_tokens`` (estimated) by evicting whole turns.
+
+    Evicted turns are folded into ``summary`` by ``summarizer(summary,
+    messages)``, by default ``extractive_summary``. The latest turn is never
+    evicted, even when it alone exceeds the budget.
+    """
+
+    def __init__(
+        self,
+        system_prompt: str = "",
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        store: SQLiteMemoryStore | None = None,
+        session_id: str = "default",
+        summarizer: Callable[[str, list[dict]], str] = extractive_summary,
+    ):
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens
+        self.store = store
+        self.session_id = session_id
+        self.summarizer = summarizer
+        self.summary = ""
+        self.history: list[dict] = []
+        self._costs: list[int] = []
+        # indices into history where a user message starts a turn
+        self._turn_starts: list[int] = []
+        self._history_tokens = 0
+        # sequence number of history[0] in the store
+        self.first_seq = 0
+        self.evictions = 0
+
+        if store is not None:
+            self.summary, self.first_seq, messages = store.load(session_id)
+            for message in messages:
+                self._add(message)
+            self._enforce_budget()
+
+    @property
+    def system_message(self) -> dict | None:
+        content = self.system_prompt
+        if self.summary:
+            content += SUMMARY_HEADER + self.summary
+        return {"role": "system", "content": content} if content else None
+
+    @property
+    def messages(self) -> list[dict]:
+        """The prompt to send: system message, then the kept turns."""
+        system = self.system_message
+        return ([system] if system else []) + self.history
+
+    @property
+    def tokens(self) -> int:
+        system = self.system_message
+        return (message_tokens(system) if system else 0) + self._history_tokens
+
+    def _add(self, message: dict) -> None:
+        if message["role"] == "user":
+            self._turn_starts.append(len(self.history))
+        cost = message_tokens(message)
+        self.history.append(message)
+        self._costs.append(cost)
+        self._history_tokens += cost
+
+    def append(self, message: dict) -> None:
+        if self.store is not None:
+            self.store.append(self.session_id, self.first_seq + len(self.history), message)
+        self._add(message)
+        self._enforce_budget()
+
+    def _enforce_budget(self) -> None:
+        if self.tokens <= self.max_tokens or len(self._turn_starts) < 2:
+            return
+        target = self.max_tokens * LOW_WATERMARK
+        # drop whole turns from the front, keeping at least the latest one
+        cut = 0
+        kept_tokens = self.tokens
+        for start in self._turn_starts[1:]:
+            kept_tokens -= sum(self._costs[cut:start])
+            cut = start
+            if kept_tokens <= target:
+                break
+
+        evicted = self.history[:cut]
+        self.history = self.history[cut:]
+        self._history_tokens -= sum(self._costs[:cut])
+        self._costs = self._costs[cut:]
+        self._turn_starts = [start - cut for start in self._turn_starts if start >= cut]
+        self.first_seq += cut
+        self.summary = _trim_summary(self.summarizer(self.summary, evicted), SUMMARY_MAX_TOKENS)
+        self.evictions += 1
+        if self.store is not None:
+            self.store.save_summary(self.session_id, self.summary, self.first_seq)
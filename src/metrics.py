@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import json
+import time
+from typing import Callable
+
+# seconds; covers handler timings (sub-ms) up to slow tool calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# JsonlExporter writes its buffered lines after this many seconds or lines,
+# instead of a write + flush on the event loop for every observation
+JSONL_FLUSH_INTERVAL_S = 5.0
+JSONL_FLUSH_LINES = 256
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Labelled histograms plus a list of push exporters called on every observation."""
+
+    def __init__(self, exporters: list | None = None, labels: dict[str, str] | None = None):
+        self.exporters = exporters or []
+        self.labels = labels or {}
+        self.histograms: dict[tuple[str, tuple[tuple[str, str], ...]], Histogram] = {}
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        labels = {**self.labels, **labels}
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+        for exporter in self.exporters:
+            exporter.export(name, value, labels)
+
+    def summary(self) -> dict[str, dict]:
+        """Count and mean per series, for logs and supervisors."""
+        return {
+            _series_name(name, dict(labels)): {"count": h.count, "mean": h.sum / h.count if h.count else 0.0}
+            for (name, labels), h in self.histograms.items()
+        }
+
+    def prometheus_text(self) -> str:
+        return prometheus_text([self])
+
+
+def _series_name(name: str, labels: dict[str, str]) -> str:
+    if not labels:
+        return name
+    body = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return f"{name}{{{body}}}"
+
+
+def prometheus_text(registries: list[MetricsRegistry]) -> str:
+    """Render several registries (e.g. one per room) as one Prometheus exposition."""
+    series: dict[str, list[tuple[dict[str, str], Histogram]]] = {}
+    for registry in registries:
+        for (name, labels), histogram in registry.histograms.items():
+            series.setdefault(name, []).append((dict(labels), histogram))
+
+    lines = []
+    for name in sorted(series):
+        lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in series[name]:
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{_series_name(name + '_bucket', labels | {'le': le})} {cumulative}")
+            lines.append(f"{_series_name(name + '_sum', labels)} {histogram.sum}")
+            lines.append(f"{_series_name(name + '_count', labels)} {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+
+class JsonlExporter:
+    """Appends every observation as one JSON line.
+
+    Lines are buffered in memory and written together every
+    ``flush_interval`` seconds or ``flush_lines`` lines, whichever comes
+    first; ``close`` writes the rest. A crash loses at most that window.
+    """
+
+    def __init__(self, path: str, flush_interval: float = JSONL_FLUSH_INTERVAL_S, flush_lines: int = JSONL_FLUSH_LINES):
+        self._file = open(path, "a", encoding="utf-8")
+        self.flush_interval = flush_interval
+        self.flush_lines = flush_lines
+        self._lines: list[str] = []
+        self._last_flush = time.monotonic()
+
+    def export(self, name: str, value: float, labels: dict[str, str]) -> None:
+        self._lines.append(json.dumps({"time": time.time(), "name": name, "value": value, **labels}))
+        if len(self._lines) >= self.flush_lines or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._lines:
+            self._file.write("\n".join(self._lines) + "\n")
+            self._file.flush()
+            self._lines.clear()
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+
+class PrometheusExporter:
+    """Serves the registry in the Prometheus text format on ``GET /metrics``."""
+
+    def __init__(self, registries: Callable[[], list[MetricsRegistry]], host: str = "127.0.0.1", port: int = 9464):
+        self.registries = registries
+        self.host = host
+        self.port = port
+        self._server: asyncio.AbstractServer | None = None
+
+    def export(self, name: str, value: float, labels: dict[str, str]) -> None:
+        pass  # pulled on scrape
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            if request_line.split()[1:2] == [b"/metrics"]:
+                body = prometheus_text(self.registries()).encode()
+                status = b"200 OK"
+            else:
+                body, status = b"not found\n", b"404 Not Found"
+            writer.write(
+                b"HTTP/1.1 " + status + b"\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+
+class TurnTracker:
+    """Monotonic timestamps for one conversational turn, turned into span histograms.
+
+    A turn starts at ``input_audio_buffer.speech_stopped`` and ends with the
+    ``response.done`` of a response that did not call tools.
+    """
+
+    def __init__(self, metrics: MetricsRegistry):
+        self.metrics = metrics
+        self.marks: dict[str, float] = {}
+        self.tool_time = 0.0
+
+    def start_turn(self) -> None:
+        self.marks = {"speech_stopped": time.monotonic()}
+        self.tool_time = 0.0
+
+    def mark(self, name: str, at: float | None = None) -> None:
+        self.marks[name] = time.monotonic() if at is None else at
+
+    def mark_once(self, name: str, at: float | None = None) -> None:
+        if name not in self.marks:
+            self.mark(name, at)
+
+    def add_tool_call(self, name: str, started: float, ended: float) -> None:
+        self.tool_time += ended - started
+        self.metrics.observe("tool_seconds", ended - started, tool=name)
+
+    def detach(self) -> TurnTracker:
+        """Hand the current turn to a new tracker and start over, so it can be finished later."""
+        turn = TurnTracker(self.metrics)
+        turn.marks, turn.tool_time = self.marks, self.tool_time
+        self.marks = {}
+        self.tool_time = 0.0
+        return turn
+
+    def finish_turn(self, first_playback: float | None) -> None:
+        marks = self.marks
+        if first_playback is not None and first_playback >= marks.get("speech_stopped", 0.0):
+            marks["first_playback"] = first_playback
+        spans = {
+            "turn_time_to_first_audio_seconds": ("speech_stopped", "first_audio_delta"),
+            "turn_time_to_first_playback_seconds": ("speech_stopped", "first_playback"),
+            "turn_playback_lag_seconds": ("first_audio_delta", "first_playback"),
+            "turn_response_seconds": ("response_created", "response_done"),
+        }
+        for name, (start, end) in spans.items():
+            if start in marks and end in marks:
+                self.metrics.observe(name, marks[end] - marks[start])
+        if "speech_stopped" in marks:
+            self.metrics.observe("turn_tool_seconds", self.tool_time)
+        self.marks = {}
+        self.tool_time = 0.0
@@ -1,6 +1,14 @@
+from __future__ import annotations
+
 import openai
 import json
 import time
+from typing import AsyncIterator
+
+from openai import AsyncOpenAI
+
+from src.function_dict import ToolFailure
+from src.memory import ConversationMemory
 
 
 class Agent:
@@ -11,19 +19,20 @@ class Agent:
         use_tools: bool = True,
         system_prompt: str = "",
         temperature: float = 0.7,
+        memory: ConversationMemory | None = None,
     ):
         self.system_prompt = system_prompt
-        if self.system_prompt != "":
-            self.messages = [
-                {"role": "system", "content": self.system_prompt},
-            ]
-        else:
-            self.messages = []
+        # history under a token budget; pass one with a store to resume a session
+        self.memory = memory if memory is not None else ConversationMemory(system_prompt)
         self.model = model
         self.use_tools = use_tools
         self.temperature = temperature
         openai.api_key = self._load_access_key(credentials_path)
 
+    @property
+    def messages(self) -> list[dict]:
+        return self.memory.messages
+
     def _load_access_key(self, credentials_path: str) -> str:
         try:
             with open(credentials_path, "r") as f:
@@ -37,7 +46,7 @@ class Agent:
         from src.function_dict import get_tools, exec_tool
 
         if user_input != "":
-            self.messages.append({"role": "user", "content": user_input})
+            self.memory.append({"role": "user", "content": user_input})
         try:
             completion_params = {
                 "model": self.model,
@@ -54,11 +63,11 @@ class Agent:
             message = response.choices[0].message
 
             if message.tool_calls:
-                self.messages.append(
+                self.memory.append(
                     {
                         "role": "assistant",
                         "content": message.content,
-                        "tool_calls": message.tool_calls,
+                        "tool_calls": [tool_call.model_dump() for tool_call in message.tool_calls],
                     }
                 )
 
@@ -70,7 +79,7 @@ class Agent:
                     print(function_name, function_args)
                     result = exec_tool(function_name, function_args)
                     result_str = str(result)
-                    self.messages.append(
+                    self.memory.append(
                         {
                             "role": "tool",
                             "content": result_str,
@@ -80,8 +89,141 @@ class Agent:
 
                 return self.process_user_input("")
 
-            self.messages.append({"role": "assistant", "content": message.content})
+            self.memory.append({"role": "assistant", "content": message.content})
             return message.content
 
         except Exception as e:
-            return f"エラーが発生しました / An error occurred: {str(e)}"
+            # a str, so callers can print it, but is_tool_failure tells it from a real answer
+            return ToolFailure(f"エラーが発生しました / An error occurred: {str(e)}")
+
+
+_async_clients: dict[str, AsyncOpenAI] = {}
+
+
+def get_async_client(api_key: str) -> AsyncOpenAI:
+    """Return the process-wide AsyncOpenAI client for ``api_key`` so connections are pooled."""
+    client = _async_clients.get(api_key)
+    if client is None:
+        client = AsyncOpenAI(api_key=api_key)
+        _async_clients[api_key] = client
+    return client
+
+
+class AsyncAgent:
+    """Streaming, non-blocking counterpart of ``Agent``.
+
+    Tool calls from one assistant message run concurrently through a
+    ``ToolExecutor`` and the conversation loops at most ``max_steps`` times.
+    """
+
+    def __init__(
+        self,
+        credentials_path: str,
+        model: str = "gpt-4o-mini",
+        use_tools: bool = True,
+        system_prompt: str = "",
+        temperature: float = 0.7,
+        max_steps: int = 5,
+        tool_executor=None,
+        memory: ConversationMemory | None = None,
+    ):
+        self.system_prompt = system_prompt
+        # history under a token budget; pass one with a store to resume a session
+        self.memory = memory if memory is not None else ConversationMemory(system_prompt)
+        self.model = model
+        self.use_tools = use_tools
+        self.temperature = temperature
+        self.max_steps = max_steps
+        self.client = get_async_client(self._load_access_key(credentials_path))
+        if tool_executor is None and use_tools:
+            from src.tool_executor import ToolExecutor
+
+            tool_executor = ToolExecutor()
+        self.tool_executor = tool_executor
+
+    @property
+    def messages(self) -> list[dict]:
+        return self.memory.messages
+
+    def _load_access_key(self, credentials_path: str) -> str:
+        try:
+            with open(credentials_path, "r") as f:
+                return json.load(f)["ACCESS_KEY"]
+        except (FileNotFoundError, KeyError, json.JSONDecodeError) as e:
+            raise RuntimeError(
+                f"Failed to load access key from {credentials_path}: {e}"
+            )
+
+    async def stream(self, user_input: str) -> AsyncIterator[str]:
+        """Yield assistant text deltas as they arrive, running tool calls in between."""
+        from src.function_dict import get_chat_tools
+
+        if user_input != "":
+            self.memory.append({"role": "user", "content": user_input})
+
+        for _ in range(self.max_steps):
+            completion_params = {
+                "model": self.model,
+                "messages": self.messages,
+                "temperature": self.temperature,
+                "stream": True,
+            }
+            if self.use_tools:
+                completion_params["tools"] = get_chat_tools()
+                completion_params["tool_choice"] = "auto"
+
+            content_parts: list[str] = []
+            tool_calls: dict[int, dict] = {}
+            response = await self.client.chat.completions.create(**completion_params)
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    content_parts.append(delta.content)
+                    yield delta.content
+                for tool_call in delta.tool_calls or []:
+                    call = tool_calls.setdefault(
+                        tool_call.index,
+                        {"id": "", "type": "function", "function": {"name": "", "arguments": ""}},
+                    )
+                    if tool_call.id:
+                        call["id"] = tool_call.id
+                    if tool_call.function and tool_call.function.name:
+                        call["function"]["name"] += tool_call.function.name
+                    if tool_call.function and tool_call.function.arguments:
+                        call["function"]["arguments"] += tool_call.function.arguments
+
+            content = "".join(content_parts) or None
+            if not tool_calls:
+                self.memory.append({"role": "assistant", "content": content})
+                return
+
+            calls = [tool_calls[index] for index in sorted(tool_calls)]
+            self.memory.append({"role": "assistant", "content": content, "tool_calls": calls})
+
+            pending = []
+            for call in calls:
+                try:
+                    function_args = json.loads(call["function"]["arguments"] or "{}")
+                except json.JSONDecodeError:
+                    function_args = {}
+                pending.append((call["function"]["name"], function_args))
+            results = await self.tool_executor.run_all(pending)
+            for call, result in zip(calls, results):
+                self.memory.append(
+                    {
+                        "role": "tool",
+                        "content": str(result),
+                        "tool_call_id": call["id"],
+                    }
+                )
+
+        raise RuntimeError(f"Agent stopped after {self.max_steps} steps without a final answer")
+
+    async def process_user_input(self, user_input: str) -> str:
+        try:
+            return "".join([delta async for delta in self.stream(user_input)])
+        except Exception as e:
+            # a str, so callers can print it, but is_tool_failure tells it from a real answer
+            return ToolFailure(f"エラーが発生しました / An error occurred: {str(e)}")
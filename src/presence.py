@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class PresenceSet:
+    """Set of uids marked present in ``inoutList``, maintained from an RTDB listener."""
+
+    def __init__(self, ref, first_sync_timeout: float = 10.0):
+        self.ref = ref
+        self.first_sync_timeout = first_sync_timeout
+        self._present: set[str] = set()
+        self._lock = threading.Lock()
+        self._synced = threading.Event()
+        self._listener = None
+
+    def start(self) -> None:
+        self._listener = self.ref.listen(self._on_event)
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def _on_event(self, event) -> None:
+        keys = [key for key in event.path.split("/") if key]
+        with self._lock:
+            if not keys:
+                if event.event_type == "put":
+                    # full snapshot of inoutList
+                    self._present = {uid for uid, value in (event.data or {}).items() if value is True}
+                else:
+                    for uid, value in (event.data or {}).items():
+                        self._apply(uid, value)
+            elif len(keys) == 1:
+                self._apply(keys[0], event.data)
+        self._synced.set()
+
+    def _apply(self, uid: str, value) -> None:
+        if value is True:
+            self._present.add(uid)
+        else:
+            self._present.discard(uid)
+
+    def uids(self) -> list[str]:
+        if not self._synced.wait(self.first_sync_timeout):
+            raise TimeoutError("inoutList listener did not deliver the initial snapshot")
+        with self._lock:
+            return sorted(self._present)
+
+
+class ProfileCache:
+    """TTL + LRU cache of uid -> user profile backed by Firestore.
+
+    Misses are fetched with a single ``get_all`` call, and a snapshot listener on
+    the collection drops entries as soon as a profile document changes.
+    """
+
+    def __init__(self, client, collection, ttl_s: float = 600.0, max_entries: int = 256):
+        self.client = client
+        self.collection = collection
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._watch = None
+
+    def start(self) -> None:
+        self._watch = self.collection.on_snapshot(self._on_snapshot)
+
+    def close(self) -> None:
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def _on_snapshot(self, docs, changes, read_time) -> None:  # noqa
+        with self._lock:
+            for change in changes:
+                self._entries.pop(change.document.id, None)
+
+    def get_many(self, uids: list[str]) -> dict[str, dict]:
+        now = time.monotonic()
+        found: dict[str, dict] = {}
+        missing: list[str] = []
+        with self._lock:
+            for uid in uids:
+                entry = self._entries.get(uid)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(uid)
+                    found[uid] = entry[1]
+                else:
+                    missing.append(uid)
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        if missing:
+            refs = [self.collection.document(uid) for uid in missing]
+            fetched = {
+                doc.id: doc.to_dict() for doc in self.client.get_all(refs) if doc.exists
+            }
+            expires_at = time.monotonic() + self.ttl_s
+            with self._lock:
+                for uid, profile in fetched.items():
+                    self._entries[uid] = (expires_at, profile)
+                    self._entries.move_to_end(uid)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            found.update(fetched)
+        return found
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from math import gcd
+
+import numpy as np
+
+
+class PolyphaseResampler:
+    """Streaming rational resampler (windowed-sinc FIR in polyphase form).
+
+    ``process`` can be called with chunks of any size; the filter history is
+    carried over so the output is the same as resampling the whole signal at
+    once. ``flush`` returns the tail once the input has ended. Samples are
+    float32 in int16 scale.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, zero_crossings: int = 16, kaiser_beta: float = 8.0):
+        g = gcd(in_rate, out_rate)
+        self.up = out_rate // g
+        self.down = in_rate // g
+        # taps per phase; widened when downsampling so the lower cutoff keeps its sharpness
+        self.taps = 2 * int(np.ceil(zero_crossings * max(1.0, self.down / self.up)))
+        self.delay = self.taps // 2
+
+        n = self.taps * self.up
+        # cutoff slightly below the lower Nyquist, as a fraction of the upsampled rate
+        cutoff = 0.5 * 0.95 / max(self.up, self.down)
+        # centred on an integer tap so the delay is exactly `delay` input samples
+        t = np.arange(n) - n // 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(n, kaiser_beta) * self.up
+        # row p holds the taps for output phase p, reversed to match the input window order
+        self._phases = h.reshape(self.taps, self.up).T[:, ::-1].astype(np.float32).copy()
+
+        self._buf = np.zeros(self.taps, dtype=np.float32)  # input history, starts with silence
+        self._buf_start = -self.taps  # input index of _buf[0]
+        self._n_in = 0
+        self._n_out = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self.up == self.down:
+            self._n_in += len(samples)
+            self._n_out += len(samples)
+            return samples.astype(np.float32, copy=False)
+        self._buf = np.concatenate([self._buf, samples.astype(np.float32, copy=False)])
+        self._n_in += len(samples)
+        return self._emit(self._n_in)
+
+    def _emit(self, available: int) -> np.ndarray:
+        # output n is centred on input (n * down) // up and needs `delay` samples of lookahead
+        last = ((available - self.delay) * self.up - 1) // self.down
+        if last < self._n_out:
+            return np.empty(0, dtype=np.float32)
+
+        count = last + 1 - self._n_out
+        out = np.empty(count, dtype=np.float32)
+        windows = np.lib.stride_tricks.sliding_window_view(self._buf, self.taps)
+        # every up-th output shares a phase and steps `down` input samples, so each
+        # phase is one strided view times one tap vector, with no gather copy
+        for r in range(min(self.up, count)):
+            position = (self._n_out + r) * self.down
+            first = position // self.up + self.delay - self.taps + 1 - self._buf_start
+            n = len(range(r, count, self.up))
+            out[r :: self.up] = windows[first : first + (n - 1) * self.down + 1 : self.down] @ self._phases[position % self.up]
+
+        self._n_out = last + 1
+        # keep only the history the next output still needs
+        keep_from = (self._n_out * self.down) // self.up + self.delay - self.taps + 1 - self._buf_start
+        self._buf = self._buf[keep_from:]
+        self._buf_start += keep_from
+        return out
+
+    def flush(self) -> np.ndarray:
+        """Return the remaining output once the input has ended."""
+        if self.up == self.down:
+            return np.empty(0, dtype=np.float32)
+        total = -(-self._n_in * self.up // self.down)
+        self._buf = np.concatenate([self._buf, np.zeros(self.delay + 1, dtype=np.float32)])
+        out = self._emit(self._n_in + self.delay + 1)
+        return out[: max(0, total - (self._n_out - len(out)))]
+
+
+def to_int16(samples: np.ndarray) -> np.ndarray:
+    return np.clip(np.rint(samples), -32768, 32767).astype(np.int16)
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+class RingBuffer:
+    """Preallocated single-channel sample FIFO.
+
+    Writes copy the incoming samples once into the backing array and reads copy
+    straight into the caller's buffer, so the audio callback never allocates.
+    Growing only happens on the writer side when the backlog exceeds capacity.
+    """
+
+    def __init__(self, capacity: int, dtype=np.int16):
+        self._buf = np.zeros(capacity, dtype=dtype)
+        self._read = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buf)
+
+    def clear(self) -> None:
+        self._read = 0
+        self._size = 0
+
+    def _grow(self, needed: int) -> None:
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        buf = np.zeros(capacity, dtype=self._buf.dtype)
+        self.read_into(buf[: self._size], consume=False)
+        self._buf = buf
+        self._read = 0
+
+    def write(self, data: np.ndarray) -> None:
+        n = len(data)
+        if n == 0:
+            return
+        if self._size + n > self.capacity:
+            self._grow(self._size + n)
+
+        capacity = self.capacity
+        start = (self._read + self._size) % capacity
+        first = min(n, capacity - start)
+        self._buf[start : start + first] = data[:first]
+        if first < n:
+            self._buf[: n - first] = data[first:]
+        self._size += n
+
+    def discard(self, n: int) -> int:
+        """Drop up to ``n`` of the oldest samples and return how many were dropped."""
+        n = max(0, min(n, self._size))
+        if n:
+            self._read = (self._read + n) % self.capacity
+            self._size -= n
+        return n
+
+    def read_into(self, out: np.ndarray, consume: bool = True) -> int:
+        """Copy up to ``len(out)`` samples into ``out`` and return how many were copied."""
+        n = min(len(out), self._size)
+        if n == 0:
+            return 0
+
+        capacity = self.capacity
+        first = min(n, capacity - self._read)
+        out[:first] = self._buf[self._read : self._read + first]
+        if first < n:
+            out[first:n] = self._buf[: n - first]
+
+        if consume:
+            self._read = (self._read + n) % capacity
+            self._size -= n
+        return n
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from src.function_dict import DEFAULT_TOOL_TIMEOUT_S, TOOL_CACHE, ToolFailure, get_tool, is_loaded, resolve_tool
+
+
+class ToolExecutor:
+    """Runs tools from ``src.function_dict`` without blocking the event loop.
+
+    Sync tools run in a bounded thread pool, coroutine tools are awaited
+    directly, and every call is bounded by the tool's ``timeout``.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+
+    async def run(self, function_name: str, function_args: dict) -> Any:
+        loop = asyncio.get_running_loop()
+        try:
+            tool = get_tool(function_name)
+            if is_loaded(function_name):
+                fn = resolve_tool(function_name, function_args)
+            else:
+                # the first call imports the tool module, keep that off the loop too
+                fn = await loop.run_in_executor(self._pool, resolve_tool, function_name, function_args)
+        except ValueError as e:
+            return ToolFailure(str(e))
+        except Exception as e:
+            return ToolFailure(f"エラーが発生しました / An error occurred: {str(e)}")
+        print(f"calling {function_name} with {function_args}...")
+        timeout = tool.get("timeout", DEFAULT_TOOL_TIMEOUT_S)
+
+        async def call():
+            if inspect.iscoroutinefunction(fn):
+                pending = fn(**function_args)
+            else:
+                pending = loop.run_in_executor(self._pool, functools.partial(fn, **function_args))
+            return await asyncio.wait_for(pending, timeout)
+
+        try:
+            # repeated reads within the tool's cache_ttl are answered without the network
+            return await TOOL_CACHE.call_async(function_name, function_args, call)
+        except asyncio.TimeoutError:
+            return ToolFailure(f"タイムアウトしました / {function_name} timed out after {timeout}s")
+        except Exception as e:
+            return ToolFailure(f"エラーが発生しました / An error occurred: {str(e)}")
+
+    async def run_all(self, calls: list[tuple[str, dict]]) -> list[Any]:
+        return await asyncio.gather(*(self.run(name, args) for name, args in calls))
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
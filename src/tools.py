@@ -1,47 +1,55 @@
-import requests
-from src.firebase import get_whiteboard_data, update_whiteboard_data, get_current_users
-from src.openai import Agent
+import asyncio
 
+from src.firebase import (
+    get_whiteboard_data,
+    get_whiteboard_snapshot,
+    update_whiteboard_data,
+    patch_whiteboard_data,
+    get_current_users,
+)
+from src.function_dict import ToolFailure, is_tool_failure
+from src.heater import HeaterClient
+from src.openai import AsyncAgent
 
-def check_heater_health_tool() -> str:
+HEATER = HeaterClient()
+
+
+async def check_heater_health_tool() -> str:
     try:
-        response = requests.get("http://192.168.2.127:28001/health", timeout=5)
-        if response.status_code != 200:
-            return f"Unexpected status code: {response.status_code}"
-        return f"heater is healthy"
-    except requests.RequestException as e:
-        return f"Error making HTTP request: {e}"
+        return await HEATER.health()
     except Exception as e:
-        return f"エラーが発生しました / An error occurred: {str(e)}"
+        return ToolFailure(f"エラーが発生しました / An error occurred: {str(e)}")
 
 
-def control_heater_tool() -> str:
+async def control_heater_tool() -> str:
     try:
-        response = requests.get("http://192.168.2.127:28001/", timeout=5)
-        if response.status_code != 200:
-            return f"Unexpected status code: {response.status_code}"
-        return f"heater is triggered"
-    except requests.RequestException as e:
-        return f"Error making HTTP request: {e}"
+        return await HEATER.trigger()
     except Exception as e:
-        return f"エラーが発生しました / An error occurred: {str(e)}"
+        return ToolFailure(f"エラーが発生しました / An error occurred: {str(e)}")
 
 
 def get_whiteboard_data_tool() -> str:
     return get_whiteboard_data()
 
 
-def edit_whiteboard_data_tool(content: str) -> str:
-    old_content = get_whiteboard_data()
-    agent = Agent(
+def patch_whiteboard_data_tool(operations: list[dict]) -> str:
+    return patch_whiteboard_data(operations)
+
+
+async def edit_whiteboard_data_tool(content: str) -> str:
+    old_content, version = await asyncio.to_thread(get_whiteboard_snapshot)
+    agent = AsyncAgent(
         "credentials/maiko-ai/openai.json",
         use_tools=False,
         model="gpt-4o",
         system_prompt=f"あなたはシェアハウスのTODO管理アシスタントです。ユーザーから与えられたホワイトボードの内容を'{content}'に従って編集し、編集後のホワイトボードの内容のみを返してください。",
         temperature=0.0,
     )
-    processed_content = agent.process_user_input(old_content)
-    return update_whiteboard_data(processed_content, old_content)
+    processed_content = await agent.process_user_input(old_content)
+    if is_tool_failure(processed_content):
+        # the rewrite failed; its error text must not become the board
+        return processed_content
+    return await asyncio.to_thread(update_whiteboard_data, processed_content, old_content, version)
 
 
 def get_current_users_tool() -> str:
@@ -0,0 +1,50 @@
+"""Event traces: recorded from a live session and replayed by ``src.fake_realtime``.
+
+Kept apart from the fake server so the app can record without importing
+the websocket server code.
+"""
+from __future__ import annotations
+
+import json
+import time
+
+
+def load_trace(path: str) -> list[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class TraceRecorder:
+    """Writes received server events as a replayable trace (JSONL).
+
+    Responses that called tools are followed by a ``response.create`` wait, so
+    a replay holds back the next response until the client sent tool outputs.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "w", encoding="utf-8")
+        self._start: float | None = None
+        self._tool_responses: set[str] = set()
+
+    def _write(self, entry: dict) -> None:
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def record(self, event) -> None:
+        now = time.monotonic()
+        if self._start is None:
+            self._start = now
+        if event.type in ("session.created", "session.updated"):
+            return  # answered by the server itself
+        data = event.to_dict() if hasattr(event, "to_dict") else dict(event)
+        self._write({"at": round(now - self._start, 4), "event": data})
+
+        if event.type == "response.output_item.done" and data["item"].get("type") == "function_call":
+            self._tool_responses.add(data["response_id"])
+        elif event.type == "response.done" and data["response"]["id"] in self._tool_responses:
+            self._tool_responses.discard(data["response"]["id"])
+            self._write({"wait": "response.create"})
+            self._start = None
+
+    def close(self) -> None:
+        self._file.close()
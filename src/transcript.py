@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import time
+from collections import OrderedDict
+from typing import Callable
+
+
+class TranscriptStore:
+    """Accumulates transcript deltas per item without quadratic string building.
+
+    Deltas are appended to a list and only joined when read. Items are evicted
+    when their response is done, and at most ``max_items`` are kept in case a
+    response never finishes. Finished items can be appended to a JSONL log.
+    """
+
+    def __init__(self, max_items: int = 16, log_path: str | None = None):
+        self.max_items = max_items
+        self.version = 0
+        self._items: OrderedDict[str, tuple[str, list[str]]] = OrderedDict()
+        self._latest_id: str | None = None
+        self._latest_final = ""
+        self._log = open(log_path, "a", encoding="utf-8") if log_path else None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def append(self, response_id: str, item_id: str, delta: str) -> None:
+        entry = self._items.get(item_id)
+        if entry is None:
+            entry = (response_id, [])
+            self._items[item_id] = entry
+            while len(self._items) > self.max_items:
+                self._evict(next(iter(self._items)))
+        else:
+            self._items.move_to_end(item_id)
+        entry[1].append(delta)
+        self._latest_id = item_id
+        self.version += 1
+
+    def text(self, item_id: str) -> str:
+        entry = self._items.get(item_id)
+        return "".join(entry[1]) if entry is not None else ""
+
+    def latest(self) -> str:
+        if self._latest_id in self._items:
+            return self.text(self._latest_id)
+        return self._latest_final
+
+    def finish_response(self, response_id: str) -> None:
+        for item_id in [i for i, (r, _) in self._items.items() if r == response_id]:
+            self._evict(item_id)
+
+    def _evict(self, item_id: str) -> None:
+        response_id, parts = self._items.pop(item_id)
+        text = "".join(parts)
+        if item_id == self._latest_id:
+            self._latest_final = text
+        if self._log is not None:
+            self._log.write(json.dumps(
+                {"time": time.time(), "response_id": response_id, "item_id": item_id, "text": text},
+                ensure_ascii=False,
+            ) + "\n")
+            self._log.flush()
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+def _print_sink(text: str) -> None:
+    sys.stdout.write(f"\rTranscript: {text}")
+    sys.stdout.flush()
+
+
+class TranscriptRenderer:
+    """Redraws the latest transcript at most ``fps`` times per second, and only when it changed."""
+
+    def __init__(self, store: TranscriptStore, fps: float = 10.0, sink: Callable[[str], None] = _print_sink):
+        self.store = store
+        self.interval = 1.0 / fps
+        self.sink = sink
+        self._rendered_version = 0
+
+    def render(self) -> None:
+        if self.store.version != self._rendered_version:
+            self._rendered_version = self.store.version
+            self.sink(self.store.latest())
+
+    async def run(self) -> None:
+        while True:
+            self.render()
+            await asyncio.sleep(self.interval)
+
+
+def create_textual_view():
+    """Return ``(app, sink)`` for a full-screen transcript view built on textual."""
+    from textual.app import App, ComposeResult
+    from textual.widgets import Static
+
+    class TranscriptApp(App):
+        def compose(self) -> ComposeResult:
+            yield Static("", id="transcript")
+
+    app = TranscriptApp()
+
+    def sink(text: str) -> None:
+        if app.is_running:
+            app.query_one("#transcript", Static).update(text)
+
+    return app, sink
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Iterator
+
+import numpy as np
+
+# capture frames handed to process_batch together (3 x 20ms); bounds the extra uplink delay to 40ms
+MIC_BATCH_FRAMES = 3
+
+
+def frame_features(frames: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Energy (dBFS), zero-crossing rate and spectral flatness for each row of ``frames``.
+
+    ``frames`` is an ``(n_frames, frame_length)`` int16 array; everything is
+    computed in one vectorized pass.
+    """
+    x = frames.astype(np.float32) / 32768.0
+    rms = np.sqrt(np.mean(x * x, axis=1))
+    energy_db = 20.0 * np.log10(rms + 1e-9)
+
+    signs = np.signbit(x)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (x.shape[1] - 1)
+
+    power = np.abs(np.fft.rfft(x * np.hanning(x.shape[1]).astype(np.float32), axis=1)) ** 2 + 1e-12
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+    return energy_db, zcr, flatness
+
+
+class VoiceActivityDetector:
+    """Energy / ZCR / flatness VAD with an adaptive noise floor, hangover and pre-roll.
+
+    ``process`` takes capture frames and returns the frames that should be sent
+    upstream: speech, ``hangover_s`` of trailing audio so server VAD still sees
+    the end of the turn, and ``preroll_s`` of audio from before the onset.
+    """
+
+    def __init__(
+        self,
+        frame_length_s: float = 0.02,
+        margin_db: float = 9.0,
+        min_rms: float = 50.0,
+        max_flatness: float = 0.45,
+        max_zcr: float = 0.35,
+        hangover_s: float = 0.8,
+        preroll_s: float = 0.3,
+        floor_rise: float = 0.02,
+        floor_fall: float = 0.3,
+    ):
+        self.margin_db = margin_db
+        self.min_energy_db = 20.0 * np.log10(min_rms / 32768.0)
+        self.max_flatness = max_flatness
+        self.max_zcr = max_zcr
+        self.hangover_frames = int(round(hangover_s / frame_length_s))
+        self.floor_rise = floor_rise
+        self.floor_fall = floor_fall
+        self.noise_floor_db: float | None = None
+        self.in_speech = False
+        self.onset_time: float | None = None
+        self._hangover = 0
+        self._preroll: deque[np.ndarray] = deque(maxlen=int(round(preroll_s / frame_length_s)))
+
+    def classify(self, frames: np.ndarray) -> np.ndarray:
+        """Raw per-frame speech decisions, updating the noise floor as it goes."""
+        energy_db, zcr, flatness = frame_features(frames)
+        if self.noise_floor_db is None:
+            self.noise_floor_db = float(np.min(energy_db))
+
+        voiced = (flatness < self.max_flatness) | (zcr < self.max_zcr)
+        decisions = np.empty(len(frames), dtype=bool)
+        # the floor depends on the previous decision, so only this part is sequential
+        for i, energy in enumerate(energy_db.tolist()):
+            loud = energy > max(self.noise_floor_db + self.margin_db, self.min_energy_db)
+            decisions[i] = loud and voiced[i]
+            if not decisions[i]:
+                rate = self.floor_fall if energy < self.noise_floor_db else self.floor_rise
+                self.noise_floor_db += rate * (energy - self.noise_floor_db)
+        return decisions
+
+    def gate(self, frames: np.ndarray) -> np.ndarray:
+        """Per-frame send decisions for ``frames`` with hangover applied (pre-roll excluded)."""
+        decisions = self.classify(frames)
+        gated = np.empty(len(frames), dtype=bool)
+        for i, speech in enumerate(decisions.tolist()):
+            if speech:
+                self._hangover = self.hangover_frames
+            elif self._hangover > 0:
+                self._hangover -= 1
+            gated[i] = speech or self._hangover > 0
+        return gated
+
+    def clear_preroll(self) -> None:
+        self._preroll.clear()
+
+    def process(self, frame: np.ndarray) -> list[np.ndarray]:
+        """Return the frames to send for one capture frame (possibly preceded by pre-roll)."""
+        return self._route(frame, bool(self.gate(frame.reshape(1, -1))[0]))
+
+    def process_batch(self, frames: list[np.ndarray]) -> Iterator[tuple[np.ndarray, list[np.ndarray]]]:
+        """``(frame, frames to send)`` per capture frame, with the features computed once for the batch.
+
+        Pre-roll is handled as each pair is consumed, so ``clear_preroll``
+        between pairs behaves as it does between ``process`` calls.
+        """
+        decisions = self.gate(np.stack(frames)).tolist()
+        for frame, send in zip(frames, decisions):
+            yield frame, self._route(frame, send)
+
+    def _route(self, frame: np.ndarray, send: bool) -> list[np.ndarray]:
+        if not send:
+            self.in_speech = False
+            self._preroll.append(frame)
+            return []
+        if self.in_speech:
+            return [frame]
+        self.in_speech = True
+        self.onset_time = time.monotonic()
+        frames = list(self._preroll)
+        self._preroll.clear()
+        frames.append(frame)
+        return frames
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import json
+import os
+import platform
+
+import numpy as np
+
+from src.resample import PolyphaseResampler, to_int16
+from src.ring_buffer import RingBuffer
+
+
+class PorcupineDetector:
+    """Picovoice Porcupine backend for the "マイコ" keyword."""
+
+    def __init__(self, credentials_path: str = "credentials/maiko-ai/picovoice.json", sensitivity: float = 0.5):
+        import pvporcupine
+
+        self.porcupine = pvporcupine.create(
+            access_key=self._load_access_key(credentials_path),
+            keyword_paths=[f"models/maiko_ja_{self._model_suffix()}.ppn"],
+            sensitivities=[sensitivity],
+            model_path="models/porcupine_params_ja.pv",
+        )
+        self.sample_rate = self.porcupine.sample_rate
+        self.frame_length = self.porcupine.frame_length
+
+    def _load_access_key(self, credentials_path: str) -> str:
+        try:
+            with open(credentials_path, "r") as f:
+                return json.load(f)["ACCESS_KEY"]
+        except (FileNotFoundError, KeyError, json.JSONDecodeError) as e:
+            raise RuntimeError(
+                f"Failed to load access key from {credentials_path}: {e}"
+            )
+
+    @staticmethod
+    def _model_suffix() -> str:
+        if os.name == "nt":
+            return "win"
+        if platform.system() == "Darwin":
+            return "mac"
+        if platform.machine().startswith(("arm", "aarch64")):
+            return "rasp"
+        return "linux"
+
+    def process(self, pcm: np.ndarray) -> bool:
+        return self.porcupine.process(pcm) >= 0
+
+    def delete(self) -> None:
+        self.porcupine.delete()
+
+
+class EnergyWakeDetector:
+    """Dependency-free stand-in that fires on a sustained loud burst, for offline testing."""
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_length: int = 512,
+        min_rms: float = 1500.0,
+        min_duration_s: float = 0.3,
+        refractory_s: float = 2.0,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_length = frame_length
+        self.min_rms = min_rms
+        self.min_frames = max(1, int(min_duration_s * sample_rate / frame_length))
+        self.refractory_frames = int(refractory_s * sample_rate / frame_length)
+        self._loud = 0
+        self._cooldown = 0
+
+    def process(self, pcm: np.ndarray) -> bool:
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            return False
+        x = pcm.astype(np.float32)
+        if np.sqrt(np.mean(x * x)) < self.min_rms:
+            self._loud = 0
+            return False
+        self._loud += 1
+        if self._loud < self.min_frames:
+            return False
+        self._loud = 0
+        self._cooldown = self.refractory_frames
+        return True
+
+    def delete(self) -> None:
+        pass
+
+
+class WakeWordStage:
+    """Feeds capture frames to a wake-word detector and keeps a pre-roll of recent audio.
+
+    Frames come straight from ``MicCapture`` as int16 arrays at ``capture_rate``
+    and are resampled, with an anti-aliasing filter, only when the detector
+    runs at a different rate. On detection, ``take_preroll`` returns the last
+    ``preroll_s`` of capture audio so the request spoken right after the
+    keyword is not lost.
+    """
+
+    def __init__(self, detector, capture_rate: int, preroll_s: float = 1.5):
+        self.detector = detector
+        self.capture_rate = capture_rate
+        self.preroll_samples = int(preroll_s * capture_rate)
+        self.detections = 0
+        self._preroll = RingBuffer(self.preroll_samples * 2)
+        self._pending = RingBuffer(detector.frame_length * 4)
+        self._frame = np.zeros(detector.frame_length, dtype=np.int16)
+        # kept for the stage's lifetime so the filter history carries across frames
+        self._resampler = None
+        if detector.sample_rate != capture_rate:
+            self._resampler = PolyphaseResampler(capture_rate, detector.sample_rate)
+
+    def _to_detector_rate(self, frame: np.ndarray) -> np.ndarray:
+        if self._resampler is None:
+            return frame
+        return to_int16(self._resampler.process(frame))
+
+    def feed(self, frame: np.ndarray) -> bool:
+        """Push one capture frame; returns True when the wake word was detected."""
+        self._preroll.write(frame)
+        self._preroll.discard(len(self._preroll) - self.preroll_samples)
+
+        self._pending.write(self._to_detector_rate(frame))
+        detected = False
+        while len(self._pending) >= self.detector.frame_length:
+            self._pending.read_into(self._frame)
+            if self.detector.process(self._frame):
+                detected = True
+        if detected:
+            self.detections += 1
+        return detected
+
+    def take_preroll(self) -> np.ndarray:
+        audio = np.empty(len(self._preroll), dtype=np.int16)
+        self._preroll.read_into(audio)
+        return audio
+
+    def close(self) -> None:
+        self.detector.delete()
+
+
+def create_wake_word_stage(backend: str | None, capture_rate: int) -> WakeWordStage | None:
+    if backend is None:
+        return None
+    if backend == "porcupine":
+        return WakeWordStage(PorcupineDetector(), capture_rate)
+    if backend == "energy":
+        return WakeWordStage(EnergyWakeDetector(), capture_rate)
+    raise ValueError(f"Unknown wake word backend: {backend}")
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import difflib
+import threading
+
+# an edit may rewrite at most this fraction of the board's lines
+MAX_DIFF_RATIO = 0.5
+
+
+class WhiteboardConflict(Exception):
+    pass
+
+
+def parse_board(content: str | None) -> list[str]:
+    """Split the board into items, one per line. Blank lines are kept to preserve layout."""
+    return (content or "").splitlines()
+
+
+def render_board(items: list[str]) -> str:
+    return "\n".join(items)
+
+
+def _find_item(items: list[str], target: str) -> int:
+    target = target.strip()
+    if not target:
+        raise ValueError("編集対象の行が指定されていません")
+    for index, item in enumerate(items):
+        if item.strip() == target:
+            return index
+    matches = [index for index, item in enumerate(items) if target in item]
+    if len(matches) == 1:
+        return matches[0]
+    if not matches:
+        raise ValueError(f"'{target}' はホワイトボードにありません")
+    raise ValueError(f"'{target}' に一致する行が複数あります")
+
+
+def apply_operations(items: list[str], operations: list[dict]) -> list[str]:
+    """Apply add/remove/update operations to a parsed board and return the new items."""
+    items = list(items)
+    for operation in operations:
+        op = operation.get("op")
+        if op == "add":
+            items.append(operation["text"])
+        elif op == "remove":
+            del items[_find_item(items, operation["target"])]
+        elif op == "update":
+            items[_find_item(items, operation["target"])] = operation["text"]
+        else:
+            raise ValueError(f"Unknown operation: {op}")
+    return items
+
+
+def diff_ratio(old_items: list[str], new_items: list[str]) -> float:
+    """Fraction of lines that differ between two boards (0.0 identical, 1.0 disjoint)."""
+    if not old_items and not new_items:
+        return 0.0
+    return 1.0 - difflib.SequenceMatcher(None, old_items, new_items, autojunk=False).ratio()
+
+
+def is_safe_edit(old_items: list[str], new_items: list[str], allow_single_line: bool = False) -> bool:
+    """True when at most ``MAX_DIFF_RATIO`` of the lines differ.
+
+    With ``allow_single_line`` (patch operations, whose effect is known), a
+    change touching one line of a non-empty board is also accepted. A
+    free-form rewrite never gets the exemption: on an empty or one-line board
+    it would let any text, including an error message, replace the board.
+    """
+    if not (allow_single_line and old_items):
+        return diff_ratio(old_items, new_items) <= MAX_DIFF_RATIO
+    matcher = difflib.SequenceMatcher(None, old_items, new_items, autojunk=False)
+    changed = sum(
+        max(i2 - i1, j2 - j1) for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"
+    )
+    return changed <= 1 or diff_ratio(old_items, new_items) <= MAX_DIFF_RATIO
+
+
+class WhiteboardCache:
+    """In-process copy of ``whiteboard/content`` kept current by an RTDB listener.
+
+    Reads are served from memory. ``version`` increases every time the content
+    changes, and writes go through ``compare_and_set`` so an edit based on a
+    stale copy is rejected instead of overwriting someone else's change.
+    """
+
+    def __init__(self, ref, first_sync_timeout: float = 10.0):
+        self.ref = ref
+        self.first_sync_timeout = first_sync_timeout
+        self.version = 0
+        self._content: str | None = None
+        self._lock = threading.Lock()
+        self._synced = threading.Event()
+        self._listener = None
+
+    def start(self) -> None:
+        self._listener = self.ref.listen(self._on_event)
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def _on_event(self, event) -> None:
+        # content is a single string leaf, so only whole-value puts are relevant
+        if event.path != "/":
+            return
+        with self._lock:
+            if event.data != self._content or not self._synced.is_set():
+                self._content = event.data
+                self.version += 1
+        self._synced.set()
+
+    def snapshot(self) -> tuple[str | None, int]:
+        if not self._synced.wait(self.first_sync_timeout):
+            raise TimeoutError("Whiteboard listener did not deliver the initial content")
+        with self._lock:
+            return self._content, self.version
+
+    def get(self) -> str | None:
+        return self.snapshot()[0]
+
+    def compare_and_set(self, content: str, expected_version: int) -> None:
+        with self._lock:
+            if self.version != expected_version:
+                raise WhiteboardConflict(
+                    f"whiteboard changed (version {self.version}, expected {expected_version})"
+                )
+            expected_content = self._content
+
+        def update(current):
+            if current != expected_content:
+                raise WhiteboardConflict("whiteboard changed on the server")
+            return content
+
+        self.ref.transaction(update)
+        with self._lock:
+            if self._content != content:
+                self._content = content
+                self.version += 1
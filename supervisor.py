@@ -0,0 +1,241 @@
+"""Runs one RealtimeApp per room on a single event loop.
+
+Rooms are read from a JSON file (see rooms.example.json). Devices are given
+by index, exact name or a glob pattern matched against ``sd.query_devices()``:
+
+    python supervisor.py rooms.json
+"""
+from __future__ import annotations
+
+import asyncio
+import fnmatch
+import json
+import sys
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from openai import AsyncOpenAI
+
+from realtime_with_fc import (
+    AUDIO_FORMAT,
+    METRICS_HOST,
+    METRICS_JSONL_PATH,
+    METRICS_PORT,
+    MIC_OVERFLOW_POLICY,
+    MIC_QUEUE_FRAMES,
+    SOUNDS_DIR,
+    TOOL_WORKERS,
+    WAKE_WORD_BACKEND,
+    RealtimeApp,
+)
+from src.audio_util import AUDIO_FORMATS, SAMPLE_RATE, AudioPlayerAsync, SoundBank
+from src.capture import MicCapture
+from src.function_dict import TOOL_CACHE
+from src.metrics import JsonlExporter, MetricsRegistry, PrometheusExporter
+from src.tool_executor import ToolExecutor
+from src.wake_word import create_wake_word_stage
+
+ROOMS_CONFIG_PATH = "rooms.json"
+# seconds between the per-room status lines
+REPORT_INTERVAL_S = 60
+
+
+@dataclass
+class RoomConfig:
+    name: str
+    input_device: int | str
+    output_device: int | str
+    wake_word: str | None = WAKE_WORD_BACKEND
+    audio_format: str = AUDIO_FORMAT
+
+
+def load_rooms(path: str) -> list[RoomConfig]:
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    rooms = [RoomConfig(**room) for room in config["rooms"]]
+    names = [room.name for room in rooms]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate room names in {path}: {names}")
+    for room in rooms:
+        if room.audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"Unknown audio format for room {room.name}: {room.audio_format}")
+    return rooms
+
+
+def match_device(spec: int | str, devices: list[dict], kind: str) -> int:
+    """Index of the one ``kind`` ("input"/"output") device whose name is ``spec`` or matches it as a glob.
+
+    Names are compared case-insensitively. An exact name wins over pattern
+    matches; several pattern matches are an error, so two rooms never end up
+    on the same device by accident.
+    """
+    channels = f"max_{kind}_channels"
+    candidates = [(index, device) for index, device in enumerate(devices) if device[channels] > 0]
+    if isinstance(spec, int):
+        if spec not in (index for index, _ in candidates):
+            raise ValueError(f"Device {spec} is not an {kind} device")
+        return spec
+
+    exact = [index for index, device in candidates if device["name"].lower() == spec.lower()]
+    if exact:
+        return exact[0]
+    matches = [index for index, device in candidates if fnmatch.fnmatch(device["name"].lower(), spec.lower())]
+    if not matches:
+        raise ValueError(f"No {kind} device matches {spec!r}")
+    if len(matches) > 1:
+        names = ", ".join(f"{index}: {devices[index]['name']}" for index in matches)
+        raise ValueError(f"Several {kind} devices match {spec!r} ({names})")
+    return matches[0]
+
+
+class Supervisor:
+    """Runs one ``RealtimeApp`` per room in this process.
+
+    The rooms share the OpenAI client and its connection pool, the tool
+    executor threads and the decoded sound bank; the Firebase and heater
+    caches in ``src.firebase``/``src.tools`` are module state, so they are
+    shared too. Connections, devices, VAD, wake word, transcripts and metrics
+    are per room. ``input_stream_factory``/``output_stream_factory`` replace
+    sounddevice (see benchmarks/bench_rooms.py).
+    """
+
+    def __init__(
+        self,
+        rooms: list[RoomConfig],
+        client: AsyncOpenAI | None = None,
+        tool_executor: Any | None = None,
+        sounds: SoundBank | None = None,
+        devices: list[dict] | None = None,
+        exporters: list | None = None,
+        input_stream_factory: Callable[..., Any] | None = None,
+        output_stream_factory: Callable[..., Any] | None = None,
+        metrics_port: int | None = METRICS_PORT,
+    ) -> None:
+        self.rooms = rooms
+        if client is None:
+            client = AsyncOpenAI(api_key=self._load_access_key("credentials/maiko-ai/openai.json"))
+        self.client = client
+        self.tool_executor = tool_executor if tool_executor is not None else ToolExecutor(max_workers=TOOL_WORKERS)
+        self.sounds = sounds if sounds is not None else SoundBank(SOUNDS_DIR)
+        self.exporters = exporters if exporters is not None else []
+        self.input_stream_factory = input_stream_factory
+        self.output_stream_factory = output_stream_factory
+        self.metrics_port = metrics_port
+        if devices is None and (input_stream_factory is None or output_stream_factory is None):
+            import sounddevice as sd
+
+            # queried once for all rooms
+            devices = list(sd.query_devices())
+        self.devices = devices or []
+        self.apps: dict[str, RealtimeApp] = {}
+
+    def _load_access_key(self, credentials_path: str) -> str:
+        try:
+            with open(credentials_path, "r") as f:
+                return json.load(f)["ACCESS_KEY"]
+        except (FileNotFoundError, KeyError, json.JSONDecodeError) as e:
+            raise RuntimeError(
+                f"Failed to load access key from {credentials_path}: {e}"
+            )
+
+    def build(self) -> None:
+        """Create the rooms' apps; needs the running loop (for MicCapture)."""
+        for room in self.rooms:
+            output_device = None
+            if self.output_stream_factory is None:
+                output_device = match_device(room.output_device, self.devices, "output")
+            input_device = None
+            capture = None
+            if self.input_stream_factory is None:
+                input_device = match_device(room.input_device, self.devices, "input")
+            else:
+                capture = MicCapture(
+                    queue_frames=MIC_QUEUE_FRAMES,
+                    overflow=MIC_OVERFLOW_POLICY,
+                    stream_factory=self.input_stream_factory,
+                )
+
+            self.apps[room.name] = RealtimeApp(
+                wake_word=create_wake_word_stage(room.wake_word, SAMPLE_RATE),
+                metrics=MetricsRegistry(self.exporters, labels={"room": room.name}),
+                client=self.client,
+                audio_player=AudioPlayerAsync(
+                    stream_factory=self.output_stream_factory,
+                    audio_format=room.audio_format,
+                    device=output_device,
+                ),
+                tool_executor=self.tool_executor,
+                capture=capture,
+                sounds=self.sounds,
+                audio_format=room.audio_format,
+                input_device=input_device,
+            )
+            print(f"[{room.name}] input device {input_device}, output device {output_device}, {room.audio_format}")
+
+    def registries(self) -> list[MetricsRegistry]:
+        return [app.metrics for app in self.apps.values()]
+
+    def report(self) -> dict[str, dict]:
+        """Per-room state, turn count, mean time to first audio and audio health."""
+        rooms = {}
+        for name, app in self.apps.items():
+            ttfa = app.metrics.summary().get(f'turn_time_to_first_audio_seconds{{room="{name}"}}')
+            playback = app.audio_player.stats()
+            rooms[name] = {
+                "state": app.state,
+                "connected": app.connected.is_set(),
+                "turns": ttfa["count"] if ttfa else 0,
+                "ttfa_ms": ttfa["mean"] * 1000 if ttfa else None,
+                "underruns": playback["underruns"],
+                "xruns": playback["xruns"],
+                "mic_overruns": app.capture.stats()["overruns"] if app.capture is not None else 0,
+            }
+        return rooms
+
+    async def _report_loop(self) -> None:
+        while True:
+            await asyncio.sleep(REPORT_INTERVAL_S)
+            for name, status in self.report().items():
+                print(f"[{name}] {status}")
+            # shared by all rooms
+            print(f"Tool cache stats: {TOOL_CACHE.stats()}")
+
+    async def _run_room(self, name: str, app: RealtimeApp) -> None:
+        # one room failing (e.g. its device vanished) must not take the others down
+        try:
+            await app.run(transcript_sink=lambda text: print(f"[{name}] {text}"))
+        except Exception as e:
+            print(f"[{name}] エラーが発生しました / An error occurred: {e}")
+        finally:
+            app.audio_player.terminate()
+            app.transcripts.close()
+
+    async def run(self) -> None:
+        self.build()
+        exporter = None
+        if self.metrics_port is not None:
+            exporter = PrometheusExporter(self.registries, METRICS_HOST, self.metrics_port)
+            await exporter.start()
+        try:
+            await asyncio.gather(
+                self._report_loop(),
+                *(self._run_room(name, app) for name, app in self.apps.items()),
+            )
+        finally:
+            if exporter is not None:
+                await exporter.close()
+
+
+async def main() -> None:
+    rooms = load_rooms(sys.argv[1] if len(sys.argv) > 1 else ROOMS_CONFIG_PATH)
+    exporters = [JsonlExporter(METRICS_JSONL_PATH)] if METRICS_JSONL_PATH else []
+    try:
+        await Supervisor(rooms, exporters=exporters).run()
+    finally:
+        # writes the observations still buffered
+        for exporter in exporters:
+            exporter.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())